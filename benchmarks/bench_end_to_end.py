@@ -0,0 +1,122 @@
+"""端到端吞吐基准：读取 → 校验 → 写结果库 → 导出，请求发往本地模拟服务。
+
+每个规模在独立子进程中通过命令行模式（cli.run_cli）完整运行一次，
+报告行/秒、请求延迟 p50/p99 和子进程峰值内存（RSS）。
+
+用法:
+    python benchmarks/bench_end_to_end.py                         # 1k/10k/100k 行
+    python benchmarks/bench_end_to_end.py --sizes 1000 --concurrency 64 --latency 200 --rate-429 0.01
+"""
+
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+from bench_write_results import make_workbook
+from mock_openai_server import add_config_arguments
+
+
+def peak_rss_mb():
+    """当前进程的峰值常驻内存（MB），无法获取时返回 None。"""
+    try:
+        import resource
+    except ImportError:  # Windows
+        try:
+            import psutil
+        except ImportError:
+            return None
+        return psutil.Process().memory_info().peak_wset / 1024 / 1024
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 单位为 KB，macOS 为字节
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def run_child(args):
+    """子进程：对一个工作簿完整运行一次命令行校验，向 stdout 输出 JSON 统计。"""
+    import logging
+    logging.basicConfig(level=logging.WARNING)
+    from cli import run_cli
+
+    with tempfile.TemporaryDirectory() as base_dir:
+        stats_path = os.path.join(base_dir, "stats.json")
+        code = run_cli([
+            args.child, "--base-url", args.base_url, "--api-key", "mock", "--model", "mock",
+            "--output-dir", os.path.join(base_dir, "out"),
+            "--concurrency", str(args.concurrency), "--batch-size", str(args.batch_size),
+            "--no-cache", "--restart", "--stats-json", stats_path,
+        ] + (["--adaptive"] if args.adaptive else []), {}, base_dir)
+        with open(stats_path, encoding="utf-8") as f:
+            stats = json.load(f)
+    stats["exit_code"] = code
+    stats["peak_rss_mb"] = peak_rss_mb()
+    print(json.dumps(stats, ensure_ascii=False))
+
+
+def start_mock_server(args):
+    command = [sys.executable, os.path.join(BENCH_DIR, "mock_openai_server.py"), "--port", "0",
+               "--latency", str(args.latency), "--sigma", str(args.sigma),
+               "--slow-rate", str(args.slow_rate), "--slow-factor", str(args.slow_factor),
+               "--rate-429", str(args.rate_429), "--rate-500", str(args.rate_500),
+               "--bad-json-rate", str(args.bad_json_rate)]
+    if args.retry_after is not None:
+        command += ["--retry-after", str(args.retry_after)]
+    if args.require_key:
+        command += ["--require-key", args.require_key]
+    proc = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    base_url = proc.stdout.readline().strip()
+    return proc, base_url
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1000,10000,100000", help="逗号分隔的行数")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--adaptive", action="store_true")
+    parser.add_argument("--batch-size", type=int, default=1)
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--base-url", help=argparse.SUPPRESS)
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args)
+        return
+
+    server, base_url = start_mock_server(args)
+    print(f"模拟服务 {base_url}，延迟中位数 {args.latency:.0f} ms，并发 {args.concurrency}，"
+          f"每次请求 {args.batch_size} 行")
+    print(f"{'行数':>8} {'耗时(s)':>9} {'行/秒':>9} {'p50(s)':>8} {'p99(s)':>8} "
+          f"{'峰值RSS(MB)':>12} {'失败行':>7}  状态")
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            for size in (int(s) for s in args.sizes.split(",")):
+                xlsx = os.path.join(tmp, f"bench_{size}.xlsx")
+                make_workbook(xlsx, size)
+                command = [sys.executable, os.path.abspath(__file__), "--child", xlsx,
+                           "--base-url", base_url, "--concurrency", str(args.concurrency),
+                           "--batch-size", str(args.batch_size)]
+                if args.adaptive:
+                    command.append("--adaptive")
+                proc = subprocess.run(command, capture_output=True, text=True, cwd=ROOT)
+                if proc.returncode != 0:
+                    print(f"{size:>8} 运行失败:\n{proc.stderr.strip()[-2000:]}")
+                    continue
+                s = json.loads(proc.stdout.strip().splitlines()[-1])
+                rss = f"{s['peak_rss_mb']:.0f}" if s["peak_rss_mb"] else "-"
+                print(f"{size:>8} {s['elapsed_seconds']:>9.1f} {s['rows_per_second']:>9.1f} "
+                      f"{s['latency_p50'] or 0:>8.2f} {s['latency_p99'] or 0:>8.2f} "
+                      f"{rss:>12} {s['failed']:>7}  {s['status']}")
+    finally:
+        server.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""启动导入耗时基准：用 python -X importtime 统计各入口模块的导入耗时。
+
+每个模块在全新的解释器进程中导入，重复多次取中位数，并列出累计耗时最高的模块，
+以及 openai / httpx / pydantic / openpyxl 等重量级依赖是否在启动阶段被导入。
+
+用法:
+    python benchmarks/bench_startup.py                   # 默认测 gui.app、cli、core.checker
+    python benchmarks/bench_startup.py gui.app --top 20 --repeat 5
+"""
+
+import os
+import sys
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_PACKAGES = ["openai", "httpx", "pydantic", "openpyxl", "customtkinter", "tkinter"]
+
+
+def import_profile(module):
+    """在新进程中导入 module，返回 {模块名: (自身耗时us, 累计耗时us)}，失败返回 None。"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        print(f"{module}: 导入失败\n{proc.stderr.strip().splitlines()[-1]}")
+        return None
+
+    profile = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        profile[name.strip()] = (int(self_us), int(cumulative_us))
+    return profile
+
+
+def report(module, repeat, top):
+    runs = []
+    for _ in range(repeat):
+        profile = import_profile(module)
+        if profile is None:
+            return
+        runs.append(profile)
+    totals = [p[module][1] for p in runs]
+    print(f"\n== import {module}: 中位数 {statistics.median(totals) / 1000:.1f} ms "
+          f"（{repeat} 次，{min(totals) / 1000:.1f}-{max(totals) / 1000:.1f} ms），"
+          f"共 {len(runs[0])} 个模块")
+
+    profile = runs[-1]
+    heavy = [p for p in HEAVY_PACKAGES if p in profile]
+    print(f"   启动阶段导入的重量级依赖: {', '.join(heavy) if heavy else '无'}")
+    ranked = sorted(profile.items(), key=lambda kv: kv[1][1], reverse=True)
+    for name, (self_us, cumulative_us) in ranked[:top]:
+        print(f"   {cumulative_us / 1000:8.1f} ms  {self_us / 1000:7.1f} ms  {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("modules", nargs="*", default=["gui.app", "cli", "core.checker"],
+                        help="要测量的入口模块")
+    parser.add_argument("--repeat", type=int, default=3, help="每个模块重复次数")
+    parser.add_argument("--top", type=int, default=15, help="列出累计耗时最高的模块数")
+    args = parser.parse_args()
+
+    print("列: 累计耗时  自身耗时  模块")
+    for module in args.modules:
+        report(module, args.repeat, args.top)
+
+
+if __name__ == "__main__":
+    main()
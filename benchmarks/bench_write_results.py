@@ -0,0 +1,83 @@
+"""write_results_to_excel 基准：对比流式写入与完整加载两种方式的耗时和峰值内存。
+
+用法:
+    python benchmarks/bench_write_results.py --rows 100000
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from openpyxl import Workbook
+
+from core.excel_handler import (
+    _inspect_for_streaming, _write_results_streaming, _write_results_full_load,
+)
+from core.result_index import ResultIndex
+
+
+def make_workbook(path, rows):
+    """生成带表头的合成翻译数据 Excel。"""
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Sheet1")
+    ws.append(["中文原文", "英文译文", "备注"])
+    for i in range(rows):
+        ws.append([f"这是第 {i} 条测试原文，包含一些常见的界面文字。",
+                   f"This is test source number {i} with some common UI text.",
+                   f"note {i % 17}"])
+    wb.save(path)
+
+
+def make_results(rows):
+    return [
+        {
+            "row": i + 2,
+            "result": {
+                "score": i % 10 + 1,
+                "issues": ["术语不一致", "语序生硬"] if i % 3 == 0 else [],
+                "suggestion": "无需修改",
+                "summary": "翻译基本准确",
+            },
+        }
+        for i in range(rows)
+    ]
+
+
+def measure(label, func, *args):
+    """分别计时和统计峰值内存（tracemalloc 会显著拖慢执行，因此分两次运行）。"""
+    started = time.perf_counter()
+    func(*args)
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    func(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<10} {elapsed:8.2f} s   峰值内存 {peak / 1024 / 1024:8.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000, help="数据行数")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        src = os.path.join(tmp, "input.xlsx")
+        make_workbook(src, args.rows)
+        results = ResultIndex(make_results(args.rows))  # 与 write_results_to_excel 一致
+        print(f"{args.rows} 行, 原文件 {os.path.getsize(src) / 1024 / 1024:.1f} MB")
+
+        info = _inspect_for_streaming(src)
+        measure("流式写入", _write_results_streaming,
+                src, results, os.path.join(tmp, "streaming.xlsx"), info)
+        measure("完整加载", _write_results_full_load,
+                src, results, os.path.join(tmp, "full.xlsx"))
+
+
+if __name__ == "__main__":
+    main()
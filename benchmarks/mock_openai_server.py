@@ -0,0 +1,265 @@
+"""本地 OpenAI 兼容模拟服务：用于压测和调试，不消耗真实 token。
+
+支持 POST /v1/chat/completions（单行与批量提示词），按配置的延迟分布返回固定格式的
+JSON 评分结果，并可按比例注入 429 限流和 500 错误。GET /stats 返回请求计数。
+
+用法:
+    python benchmarks/mock_openai_server.py --port 8000 --latency 300 --sigma 0.5 --rate-429 0.02
+    然后将 Base URL 设为 http://127.0.0.1:8000/v1（API Key 和模型名任意）
+"""
+
+import re
+import sys
+import json
+import asyncio
+import math
+import time
+import random
+import hashlib
+import argparse
+import threading
+
+BATCH_PATTERN = re.compile(r"以下共有 (\d+) 组")
+
+HTTP_REASONS = {200: "OK", 401: "Unauthorized", 404: "Not Found", 429: "Too Many Requests",
+                500: "Internal Server Error"}
+
+
+class MockConfig:
+    """模拟服务的行为参数。
+
+    Args:
+        latency_ms: 延迟中位数（毫秒）
+        sigma: 对数正态分布的形状参数，0 表示固定延迟
+        slow_rate: 额外的慢请求比例（模拟长尾）
+        slow_factor: 慢请求的延迟倍数
+        rate_429: 返回 429 的比例
+        rate_500: 返回 500 的比例
+        retry_after: 429 响应附带的 Retry-After 秒数，None 表示不带
+        bad_json_rate: 返回无法解析内容的比例
+        api_key: 设置后只接受该 API Key，其他请求返回 401
+    """
+
+    def __init__(self, latency_ms=300, sigma=0.3, slow_rate=0.0, slow_factor=10.0,
+                 rate_429=0.0, rate_500=0.0, retry_after=None, bad_json_rate=0.0,
+                 api_key=None):
+        self.latency_ms = latency_ms
+        self.sigma = sigma
+        self.slow_rate = slow_rate
+        self.slow_factor = slow_factor
+        self.rate_429 = rate_429
+        self.rate_500 = rate_500
+        self.retry_after = retry_after
+        self.bad_json_rate = bad_json_rate
+        self.api_key = api_key
+
+    def sample_latency(self):
+        """按配置抽样一次延迟（秒）。"""
+        latency = self.latency_ms / 1000.0
+        if self.sigma > 0:
+            latency *= math.exp(random.gauss(0, self.sigma))
+        if self.slow_rate and random.random() < self.slow_rate:
+            latency *= self.slow_factor
+        return latency
+
+
+def fake_result(text, row_id=None):
+    """根据文本内容生成确定的评分结果，保证相同输入得到相同输出。"""
+    digest = hashlib.md5(text.encode("utf-8")).digest()
+    score = digest[0] % 10 + 1
+    result = {
+        "score": score,
+        "issues": ["模拟问题：术语不一致"] if score <= 7 else [],
+        "suggestion": "" if score > 7 else "模拟修改建议",
+        "summary": "模拟评估结果",
+    }
+    if row_id is not None:
+        result["id"] = row_id
+    return result
+
+
+def build_content(user_prompt):
+    """生成模型输出文本：批量提示词返回 JSON 数组，否则返回单个 JSON 对象。"""
+    match = BATCH_PATTERN.search(user_prompt)
+    if match:
+        count = int(match.group(1))
+        items = [fake_result(f"{user_prompt}#{i}", i) for i in range(1, count + 1)]
+        return json.dumps(items, ensure_ascii=False)
+    return json.dumps(fake_result(user_prompt), ensure_ascii=False)
+
+
+class MockServer:
+    """基于 asyncio 的最小 HTTP/1.1 服务（keep-alive），单线程即可维持大量并发连接。
+
+    模拟延迟用 asyncio.sleep 实现，不占用线程，服务端本身不会成为压测瓶颈。
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.stats = {"completed": 0, "rate_limited": 0, "server_errors": 0,
+                      "unauthorized": 0}
+        self.server_address = None
+        self._loop = None
+        self._server = None
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length", 0))
+                body = await reader.readexactly(length) if length else b""
+
+                status, payload, extra_headers = await self._route(
+                    method, path, headers, body)
+                data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                head = [f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}",
+                        "Content-Type: application/json",
+                        f"Content-Length: {len(data)}"]
+                head += [f"{name}: {value}" for name, value in extra_headers.items()]
+                # 响应头与正文一次写出
+                writer.write("\r\n".join(head).encode("latin-1") + b"\r\n\r\n" + data)
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _route(self, method, path, headers, body):
+        """返回 (状态码, JSON 响应, 额外响应头)。"""
+        path = path.split("?", 1)[0].rstrip("/")
+        if method == "GET" and path == "/stats":
+            return 200, dict(self.stats), {}
+        if method != "POST" or not path.endswith("/chat/completions"):
+            return 404, {"error": {"message": "not found"}}, {}
+
+        config = self.config
+        if config.api_key and headers.get("authorization") != f"Bearer {config.api_key}":
+            self.stats["unauthorized"] += 1
+            return 401, {"error": {"message": "Incorrect API key provided (mock)",
+                                   "type": "invalid_request_error",
+                                   "code": "invalid_api_key"}}, {}
+        request = json.loads(body or b"{}")
+        await asyncio.sleep(config.sample_latency())
+
+        roll = random.random()
+        if roll < config.rate_429:
+            self.stats["rate_limited"] += 1
+            headers = {}
+            if config.retry_after is not None:
+                headers["Retry-After"] = str(config.retry_after)
+            return 429, {"error": {
+                "message": "Rate limit reached (mock)",
+                "type": "rate_limit_exceeded", "code": "rate_limit_exceeded",
+            }}, headers
+        if roll < config.rate_429 + config.rate_500:
+            self.stats["server_errors"] += 1
+            return 500, {"error": {"message": "Internal error (mock)",
+                                   "type": "server_error"}}, {}
+
+        messages = request.get("messages", [])
+        user_prompt = messages[-1]["content"] if messages else ""
+        if random.random() < config.bad_json_rate:
+            content = "抱歉，我无法按要求的格式回答。"
+        else:
+            content = build_content(user_prompt)
+
+        prompt_tokens = sum(len(m.get("content", "")) for m in messages) // 2
+        completion_tokens = len(content) // 2
+        self.stats["completed"] += 1
+        return 200, {
+            "id": f"chatcmpl-mock-{self.stats['completed']}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "mock"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }, {}
+
+    async def serve(self, host, port, ready=None):
+        self._loop = asyncio.get_running_loop()
+        self._server = await asyncio.start_server(
+            self._handle_connection, host, port, backlog=1024)
+        self.server_address = self._server.sockets[0].getsockname()
+        if ready:
+            ready.set()
+        async with self._server:
+            await self._server.serve_forever()
+
+    def shutdown(self):
+        if self._loop and self._server:
+            self._loop.call_soon_threadsafe(self._server.close)
+
+
+def start_server(config, host="127.0.0.1", port=0):
+    """在后台线程启动模拟服务，返回 server（server.server_address 为实际地址）。"""
+    server = MockServer(config)
+    ready = threading.Event()
+    threading.Thread(target=lambda: asyncio.run(server.serve(host, port, ready)),
+                     daemon=True).start()
+    ready.wait()
+    return server
+
+
+def add_config_arguments(parser):
+    parser.add_argument("--latency", type=float, default=300, help="延迟中位数（毫秒）")
+    parser.add_argument("--sigma", type=float, default=0.3, help="对数正态延迟的形状参数")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="长尾慢请求比例")
+    parser.add_argument("--slow-factor", type=float, default=10.0, help="慢请求延迟倍数")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="429 限流比例")
+    parser.add_argument("--rate-500", type=float, default=0.0, help="500 错误比例")
+    parser.add_argument("--retry-after", type=float, help="429 响应的 Retry-After 秒数")
+    parser.add_argument("--bad-json-rate", type=float, default=0.0, help="返回无效内容的比例")
+    parser.add_argument("--require-key", help="只接受该 API Key，其他请求返回 401")
+
+
+def config_from_args(args):
+    return MockConfig(
+        latency_ms=args.latency, sigma=args.sigma,
+        slow_rate=args.slow_rate, slow_factor=args.slow_factor,
+        rate_429=args.rate_429, rate_500=args.rate_500,
+        retry_after=args.retry_after, bad_json_rate=args.bad_json_rate,
+        api_key=args.require_key,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000, help="端口，0 表示自动分配")
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    server = start_server(config_from_args(args), args.host, args.port)
+    host, port = server.server_address[:2]
+    # 第一行输出供基准脚本解析地址
+    print(f"http://{host}:{port}/v1", flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+        sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
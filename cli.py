@@ -0,0 +1,324 @@
+"""命令行模式：无界面批量校验，供服务器、定时任务和 CI 使用。
+
+用法:
+    python main.py check FILE [--prompt 名称] [--concurrency N] ...
+
+不导入 tkinter / customtkinter，可在无图形环境的 Linux 上运行。
+进度输出到 stderr，运行统计以 JSON 输出到 stdout（或 --stats-json 指定的文件）。
+
+退出码:
+    0  校验完成
+    1  运行出错（配置、API、文件读写等）
+    2  命令行参数错误
+    3  存在评分不高于 --fail-under 的行
+    130  被中断（Ctrl+C），已完成的结果已保存，可再次运行续传
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import itertools
+import threading
+from datetime import datetime
+
+from core.checker import TranslationChecker, CheckerState
+from core.concurrency import percentile
+from core.excel_handler import (
+    iter_excel, count_excel_rows, write_results_to_excel, write_report_rows,
+)
+from core.prompts import get_prompt_names
+
+logger = logging.getLogger(__name__)
+
+EXIT_OK = 0
+EXIT_ERROR = 1
+EXIT_LOW_SCORE = 3
+EXIT_INTERRUPTED = 130
+
+API_KEY_ENV = "TRANSLATION_CHECKER_API_KEY"
+
+
+def build_parser(config):
+    parser = argparse.ArgumentParser(
+        prog="main.py check",
+        description="无界面校验 Excel 中的翻译，未指定的参数取自 config.json",
+    )
+    parser.add_argument("file", help="待校验的 Excel 文件")
+    parser.add_argument("--prompt", help="提示词模板名称（内置或 config.json 中的自定义提示词）")
+    parser.add_argument("--output-dir", help="输出目录，默认与 Excel 文件相同")
+    parser.add_argument("--base-url", default=config.get("base_url"))
+    parser.add_argument("--model", default=config.get("model"))
+    parser.add_argument("--api-key", help=f"API Key，默认取环境变量 {API_KEY_ENV} 或 config.json")
+    parser.add_argument("--concurrency", type=int, default=config.get("concurrency", 1))
+    parser.add_argument("--adaptive", action=argparse.BooleanOptionalAction,
+                        default=config.get("adaptive_concurrency", False),
+                        help="根据延迟和限流自动调整并发数（--concurrency 为上限）")
+    parser.add_argument("--batch-size", type=int, default=config.get("batch_size", 1))
+    parser.add_argument("--rpm", type=int, default=config.get("rpm", 0))
+    parser.add_argument("--tpm", type=int, default=config.get("tpm", 0))
+    parser.add_argument("--hedge-percentile", type=int, metavar="P",
+                        default=config.get("hedge_percentile", 0),
+                        help="请求超过 pP 延迟仍未返回时发出对冲请求，0 表示关闭")
+    parser.add_argument("--hedge-base-url", default=config.get("hedge_base_url", ""),
+                        help="对冲请求发往的备用服务商，默认同 --base-url")
+    parser.add_argument("--hedge-model", default=config.get("hedge_model", ""))
+    parser.add_argument("--hedge-api-key", default=config.get("hedge_api_key", ""))
+    parser.add_argument("--no-extra-providers", action="store_true",
+                        help="只使用主服务商，忽略 config.json 中的 extra_providers")
+    parser.add_argument("--cache", action=argparse.BooleanOptionalAction,
+                        default=config.get("use_cache", True), help="复用响应缓存")
+    parser.add_argument("--restart", action="store_true",
+                        help="放弃该文件未完成的运行并重新开始（默认自动续传）")
+    parser.add_argument("--fail-under", type=int, metavar="SCORE",
+                        help="存在评分不高于 SCORE 的行时以退出码 3 结束")
+    parser.add_argument("--stats-json", metavar="PATH",
+                        help="将运行统计写入该文件（默认输出到 stdout）")
+    parser.add_argument("--verbose", action="store_true", help="在终端输出详细日志")
+    return parser
+
+
+class ProgressPrinter:
+    """在 stderr 输出进度行，最多每 interval 秒刷新一次。"""
+
+    def __init__(self, stream=sys.stderr, interval=1.0, start_count=0):
+        self.stream = stream
+        self.interval = interval
+        self.start_count = start_count  # 续传时之前已完成的行数，不计入速度
+        self.tty = stream.isatty()
+        self.started = time.monotonic()
+        self._last = 0.0
+
+    def update(self, current, total, force=False):
+        now = time.monotonic()
+        if not force and now - self._last < self.interval:
+            return
+        self._last = now
+        elapsed = now - self.started
+        rate = (current - self.start_count) / elapsed if elapsed > 0 else 0
+        percent = f" ({current / total:.0%})" if total else ""
+        line = f"已完成 {current}/{total or '?'}{percent}  {rate:.1f} 行/秒"
+        if self.tty:
+            self.stream.write(f"\r{line}\033[K")
+        else:
+            self.stream.write(line + "\n")
+        self.stream.flush()
+
+    def finish(self):
+        if self.tty:
+            self.stream.write("\n")
+            self.stream.flush()
+
+
+def _round(value, digits=3):
+    return round(value, digits) if value is not None else None
+
+
+def _resolve_prompt(name, config):
+    """返回 (prompt_name, custom_prompt)，找不到时抛出 ValueError。"""
+    custom_prompts = config.get("custom_prompts", {})
+    names = list(get_prompt_names()) + [n for n in custom_prompts if n not in get_prompt_names()]
+    name = name or names[0]
+    if name in custom_prompts:
+        return name, custom_prompts[name]
+    if name not in names:
+        raise ValueError(f"未找到提示词模板: {name}（可选: {', '.join(names)}）")
+    return name, None
+
+
+def run_cli(argv, config, base_dir):
+    """执行 check 子命令，返回退出码。"""
+    args = build_parser(config).parse_args(argv)
+
+    if not args.verbose:
+        # 终端只保留警告，详细日志仍写入 translation_checker.log
+        for handler in logging.getLogger().handlers:
+            if type(handler) is logging.StreamHandler:
+                handler.setLevel(logging.WARNING)
+
+    def fail(message):
+        print(f"错误: {message}", file=sys.stderr)
+        return EXIT_ERROR
+
+    excel_path = os.path.abspath(args.file)
+    if not os.path.exists(excel_path):
+        return fail(f"文件不存在: {args.file}")
+
+    api_key = args.api_key or os.environ.get(API_KEY_ENV) or config.get("api_key")
+    if not args.base_url or not api_key or not args.model:
+        return fail(f"未配置 API（Base URL、API Key、模型名称），"
+                    f"请通过参数、环境变量 {API_KEY_ENV} 或 config.json 提供")
+
+    try:
+        prompt_name, custom_prompt = _resolve_prompt(args.prompt, config)
+    except ValueError as e:
+        return fail(str(e))
+
+    output_dir = os.path.abspath(args.output_dir or os.path.dirname(excel_path))
+    os.makedirs(output_dir, exist_ok=True)
+    base_name = os.path.splitext(os.path.basename(excel_path))[0]
+    export_path = os.path.join(output_dir, f"{base_name}_progress.csv")
+
+    try:
+        rows = iter_excel(excel_path)
+        first = next(rows, None)
+        if first is None:
+            return fail("Excel 文件中没有找到有效数据")
+        total = count_excel_rows(excel_path)
+    except Exception as e:
+        return fail(f"读取 Excel 失败: {e}")
+    data = itertools.chain([first], rows)
+
+    checker = TranslationChecker(
+        os.path.join(base_dir, "checkpoints"),
+        cache_max_entries=config.get("cache_max_entries", 100000),
+    )
+    resume = False
+    resumed = 0  # 续传时之前已完成的行数
+    if args.restart:
+        checker.delete_checkpoint(excel_path)
+    else:
+        cp = checker.load_checkpoint(excel_path)
+        if cp:
+            resume = True
+            resumed = len(cp["completed_rows"])
+            print(f"续传未完成的运行，已完成 {resumed} 行", file=sys.stderr)
+
+    progress = ProgressPrinter(start_count=resumed)
+    done = threading.Event()
+    outcome = {"results": None, "error": None}
+
+    def on_complete(results):
+        outcome["results"] = results
+        done.set()
+
+    def on_error(message):
+        outcome["error"] = message
+        done.set()
+
+    def on_state_change(state):
+        if state == CheckerState.IDLE:  # 停止后
+            done.set()
+
+    checker.on_progress = lambda current, total_, _item: progress.update(current, total_)
+    checker.on_complete = on_complete
+    checker.on_error = on_error
+    checker.on_state_change = on_state_change
+
+    api_config = {
+        "base_url": args.base_url,
+        "api_key": api_key,
+        "model": args.model,
+        "rpm": args.rpm,
+        "tpm": args.tpm,
+        "use_cache": args.cache,
+        "provider": config.get("provider"),
+        "extra_providers": [] if args.no_extra_providers else config.get("extra_providers", []),
+        "hedge_percentile": args.hedge_percentile,
+        "hedge_base_url": args.hedge_base_url,
+        "hedge_api_key": args.hedge_api_key,
+        "hedge_model": args.hedge_model,
+    }
+    started = time.monotonic()
+    checker.start(
+        data, excel_path, prompt_name, custom_prompt, api_config, resume=resume,
+        concurrency=args.concurrency, adaptive=args.adaptive,
+        batch_size=args.batch_size, total=total, export_path=export_path,
+    )
+
+    interrupted = False
+    while not done.is_set():
+        try:
+            done.wait(0.1)
+        except KeyboardInterrupt:
+            if not interrupted:
+                interrupted = True
+                print("\n正在停止，取消在途请求并保存已完成的结果（再次 Ctrl+C 强制退出）...", file=sys.stderr)
+                checker.stop()
+            else:
+                return EXIT_INTERRUPTED
+    elapsed = time.monotonic() - started
+
+    run_id = checker.run_id
+    processed = checker.store.count_results(run_id)
+    progress.update(processed, total, force=True)
+    progress.finish()
+
+    outputs = {"progress_csv": export_path}
+    status = "completed"
+    if outcome["error"] is not None:
+        status = "error"
+    elif outcome["results"] is None:
+        status = "stopped"
+    else:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        checked_path = os.path.join(output_dir, f"{base_name}_checked_{timestamp}.xlsx")
+        report_path = os.path.join(output_dir, f"{base_name}_report_{timestamp}.xlsx")
+        try:
+            write_results_to_excel(excel_path, outcome["results"], checked_path)
+            outputs["checked_xlsx"] = checked_path
+            write_report_rows(outcome["results"], report_path)
+            outputs["report_xlsx"] = report_path
+        except Exception as e:
+            logger.exception("写入结果文件失败")
+            outcome["error"] = f"写入结果文件失败: {e}"
+            status = "error"
+
+    score_counts = checker.store.count_by_score(run_id)
+    if status == "completed":
+        checker.discard_run(run_id)  # 结果文件已写出，结果库不再保留逐行结果
+    failed = score_counts.get(0, 0)
+    low_score_rows = (sum(n for s, n in score_counts.items()
+                          if s is not None and s <= args.fail_under)
+                      if args.fail_under is not None else None)
+    lookups = checker.cache.hits + checker.cache.misses
+    hedge = checker.hedge
+    stats = {
+        "status": status,
+        "error": outcome["error"],
+        "file": excel_path,
+        "run_id": run_id,
+        "prompt": prompt_name,
+        "model": args.model,
+        "total": total,
+        "processed": processed,
+        "resumed": resumed,
+        "failed": failed,
+        "score_counts": {str(s): n for s, n in score_counts.items()},
+        "low_score_rows": low_score_rows,
+        "elapsed_seconds": round(elapsed, 2),
+        "rows_per_second": round((processed - resumed) / elapsed, 2) if elapsed > 0 else None,
+        "cache_hit_rate": round(checker.cache.hits / lookups, 4) if lookups else None,
+        "requests": len(checker.latencies),
+        "retries": checker.retries,
+        "latency_p50": _round(percentile(checker.latencies, 0.5)),
+        "latency_p99": _round(percentile(checker.latencies, 0.99)),
+        "hedged_requests": hedge.hedged if hedge else None,
+        "hedge_rate": _round(hedge.hedge_rate, 4) if hedge else None,
+        "hedge_wins": hedge.wins if hedge else None,
+        "hedge_saved_seconds": _round(hedge.saved_seconds, 2) if hedge else None,
+        "providers": checker.pool.stats() if checker.pool else None,
+        "outputs": outputs,
+    }
+    checker.close()
+    stats_text = json.dumps(stats, ensure_ascii=False, indent=2)
+    if args.stats_json:
+        with open(args.stats_json, "w", encoding="utf-8") as f:
+            f.write(stats_text)
+    else:
+        print(stats_text)
+
+    if interrupted:
+        return EXIT_INTERRUPTED
+    if status != "completed":
+        if outcome["error"]:
+            print(f"错误: {outcome['error']}", file=sys.stderr)
+        return EXIT_ERROR
+    if processed and failed == processed:
+        print("错误: 全部行校验失败，请检查 API 配置", file=sys.stderr)
+        return EXIT_ERROR
+    if low_score_rows:
+        return EXIT_LOW_SCORE
+    return EXIT_OK
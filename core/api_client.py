@@ -2,51 +2,199 @@
 
 import json
 import time
+import asyncio
 import logging
-from openai import OpenAI
+import importlib.util
+
+import httpx
+from openai import OpenAI, AsyncOpenAI, APIConnectionError, APIStatusError
+
+from core.errors import ErrorKind, LLMCallError
+from core.retry import retry_delay, parse_retry_after
+from core.rate_limiter import estimate_tokens, COMPLETION_TOKENS_ESTIMATE
 
 logger = logging.getLogger(__name__)
 
-# 预置服务商配置
-PRESET_PROVIDERS = {
-    "OpenAI": {
-        "base_url": "https://api.openai.com/v1",
-        "default_model": "gpt-4o",
-    },
-    "DeepSeek": {
-        "base_url": "https://api.deepseek.com/v1",
-        "default_model": "deepseek-chat",
-    },
-    "通义千问": {
-        "base_url": "https://dashscope.aliyuncs.com/compatible-mode/v1",
-        "default_model": "qwen-plus",
-    },
-    "Moonshot (Kimi)": {
-        "base_url": "https://api.moonshot.cn/v1",
-        "default_model": "moonshot-v1-8k",
-    },
-    "智谱 (GLM)": {
-        "base_url": "https://open.bigmodel.cn/api/paas/v4",
-        "default_model": "glm-4",
-    },
-    "自定义": {
-        "base_url": "",
-        "default_model": "",
-    },
-}
-
-
-class LLMClient:
-    """LLM API 客户端，支持 OpenAI 兼容接口。"""
+# 安装了 h2 时启用 HTTP/2，多个请求复用同一连接
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+def classify_error(error):
+    """将 API 调用异常归类为 ErrorKind。"""
+    if isinstance(error, LLMCallError):
+        return error.kind
+    if isinstance(error, APIConnectionError):  # 包括 APITimeoutError
+        return ErrorKind.SERVER
+    if not isinstance(error, APIStatusError):
+        return ErrorKind.OTHER
+    status = error.status_code
+    if status == 429:
+        # 部分服务商用 429 表示余额不足，重试无意义
+        return ErrorKind.QUOTA if error.code == "insufficient_quota" else ErrorKind.RATE_LIMIT
+    if status == 402:
+        return ErrorKind.QUOTA
+    if status in (401, 403):
+        return ErrorKind.AUTH
+    if status in (400, 404, 422):
+        return ErrorKind.BAD_REQUEST
+    if status >= 500 or status in (408, 409):
+        return ErrorKind.SERVER
+    return ErrorKind.OTHER
+
+
+def to_call_error(error):
+    """将 SDK 异常转换为带分类和 Retry-After 的 LLMCallError。"""
+    if isinstance(error, LLMCallError):
+        return error
+    response = getattr(error, "response", None)
+    retry_after = parse_retry_after(response.headers) if response is not None else None
+    return LLMCallError(str(error), classify_error(error), retry_after)
+
 
-    def __init__(self, base_url, api_key, model, timeout=60, max_retries=3):
+class BaseLLMClient:
+    """同步/异步客户端共用的配置与响应解析。"""
+
+    def __init__(self, model, timeout=60, max_retries=3, cache=None):
         self.model = model
         self.timeout = timeout
         self.max_retries = max_retries
+        self.temperature = 0.3
+        self.cache = cache  # ResponseCache，None 表示不使用缓存
+
+    def _cache_key(self, system_prompt, user_prompt, model=None):
+        return self.cache.make_key(model or self.model, system_prompt, user_prompt,
+                                   self.temperature)
+
+    def cached(self, system_prompt, user_prompt, models=None):
+        """查找单行请求的响应缓存，返回解析后的结果，未启用缓存或未命中时返回 None。
+
+        Args:
+            models: 查找这些模型的缓存（任一命中即可），缺省为本客户端的模型
+        """
+        if not self.cache:
+            return None
+        keys = [self.cache.make_key(model, system_prompt, user_prompt, self.temperature)
+                for model in models or [self.model]]
+        content = self.cache.get_any(keys)
+        if content is None:
+            return None
+        return self._parse_response(content)
+
+    def _messages(self, system_prompt, user_prompt):
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt},
+        ]
+
+    @staticmethod
+    def _extract_json_text(content):
+        """提取 JSON 文本（有些模型会用 ```json 包裹）。"""
+        if "```json" in content:
+            start = content.index("```json") + 7
+            end = content.index("```", start)
+            content = content[start:end].strip()
+        elif "```" in content:
+            start = content.index("```") + 3
+            end = content.index("```", start)
+            content = content[start:end].strip()
+        return content
+
+    @staticmethod
+    def _validate_result(result):
+        """校验并规范化单条结果，缺少必需字段时返回 None。"""
+        required = {"score", "issues", "suggestion", "summary"}
+        if not isinstance(result, dict) or not required.issubset(result.keys()):
+            return None
+        result["score"] = int(result["score"])
+        if not isinstance(result["issues"], list):
+            result["issues"] = [str(result["issues"])]
+        return result
+
+    def _try_parse(self, content):
+        """解析 LLM 返回的 JSON 内容，失败返回 None。"""
+        try:
+            return self._validate_result(json.loads(self._extract_json_text(content)))
+        except (json.JSONDecodeError, ValueError, KeyError, TypeError):
+            return None
+
+    def _parse_response(self, content):
+        """解析 LLM 返回的 JSON 内容。"""
+        result = self._try_parse(content)
+        if result is not None:
+            return result
+
+        # 解析失败，返回包装结果
+        content = self._extract_json_text(content)
+        logger.warning("JSON解析失败，返回原始文本")
+        return {
+            "score": 0,
+            "issues": ["返回格式异常，无法解析"],
+            "suggestion": content,
+            "summary": "模型返回格式异常，请查看建议列中的原始输出",
+        }
+
+    def _parse_batch_response(self, content, count):
+        """解析批量请求返回的 JSON 数组。
+
+        Returns:
+            list: 长度为 count，按编号顺序排列；无法解析的条目为 None
+        """
+        results = [None] * count
+        try:
+            entries = json.loads(self._extract_json_text(content))
+        except (json.JSONDecodeError, ValueError):
+            logger.warning("批量结果JSON解析失败")
+            return results
+
+        # 兼容 {"results": [...]} 形式的包裹
+        if isinstance(entries, dict):
+            entries = next((v for v in entries.values() if isinstance(v, list)), [])
+        if not isinstance(entries, list):
+            return results
+
+        indexes = self._batch_indexes(entries, count)
+        if indexes is None:
+            logger.warning(f"批量结果条数 {len(entries)} 与请求条数 {count} 不符且编号无效")
+            return results
+        for index, entry in zip(indexes, entries):
+            try:
+                result = self._validate_result(entry)
+            except (ValueError, TypeError, KeyError):
+                continue
+            if result is not None:
+                result.pop("id", None)
+                results[index] = result
+        return results
+
+    @staticmethod
+    def _batch_indexes(entries, count):
+        """返回各条目对应的位置（0 起）。
+
+        编号恰好是 1..count 时按编号对应（模型可能打乱顺序）；否则编号不可信
+        （如从 0 开始编号会让每行拿到相邻行的结论），条数一致时按顺序对应，
+        条数也不一致时返回 None，由调用方逐行重试。
+        """
+        try:
+            ids = [int(entry["id"]) for entry in entries]
+        except (KeyError, TypeError, ValueError):
+            ids = None
+        if ids is not None and sorted(ids) == list(range(1, count + 1)):
+            return [i - 1 for i in ids]
+        if len(entries) == count:
+            return list(range(count))
+        return None
+
+
+class LLMClient(BaseLLMClient):
+    """LLM API 客户端，支持 OpenAI 兼容接口。"""
+
+    def __init__(self, base_url, api_key, model, timeout=60, max_retries=3, cache=None):
+        super().__init__(model, timeout, max_retries, cache)
         self.client = OpenAI(
             base_url=base_url,
             api_key=api_key,
             timeout=timeout,
+            max_retries=0,  # 由本类按错误类型重试
         )
 
     def call(self, system_prompt, user_prompt):
@@ -61,8 +209,14 @@ class LLMClient:
             如果解析失败则返回原始文本的包装结果
 
         Raises:
-            Exception: API 调用失败且重试耗尽时抛出
+            LLMCallError: 不可重试的错误，或重试耗尽
         """
+        if self.cache:
+            key = self._cache_key(system_prompt, user_prompt)
+            cached = self.cache.get(key)
+            if cached is not None:
+                return self._parse_response(cached)
+
         last_error = None
 
         for attempt in range(1, self.max_retries + 1):
@@ -70,57 +224,29 @@ class LLMClient:
                 logger.info(f"API调用 (第{attempt}次尝试)")
                 response = self.client.chat.completions.create(
                     model=self.model,
-                    messages=[
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": user_prompt},
-                    ],
-                    temperature=0.3,
+                    messages=self._messages(system_prompt, user_prompt),
+                    temperature=self.temperature,
                 )
                 content = response.choices[0].message.content.strip()
-                return self._parse_response(content)
+                result = self._try_parse(content)
+                if result is None:
+                    return self._parse_response(content)
+                if self.cache:
+                    self.cache.put(key, content)
+                return result
 
             except Exception as e:
-                last_error = e
+                last_error = to_call_error(e)
                 logger.warning(f"API调用失败 (第{attempt}次): {e}")
+                if not last_error.retryable:
+                    raise last_error from e
                 if attempt < self.max_retries:
-                    wait = 2 ** attempt
-                    logger.info(f"等待 {wait} 秒后重试...")
+                    wait = retry_delay(attempt, last_error.retry_after)
+                    logger.info(f"等待 {wait:.1f} 秒后重试...")
                     time.sleep(wait)
 
-        raise Exception(f"API调用失败，已重试{self.max_retries}次: {last_error}")
-
-    def _parse_response(self, content):
-        """解析 LLM 返回的 JSON 内容。"""
-        # 尝试提取 JSON 块（有些模型会用 ```json 包裹）
-        if "```json" in content:
-            start = content.index("```json") + 7
-            end = content.index("```", start)
-            content = content[start:end].strip()
-        elif "```" in content:
-            start = content.index("```") + 3
-            end = content.index("```", start)
-            content = content[start:end].strip()
-
-        try:
-            result = json.loads(content)
-            # 验证必需字段
-            required = {"score", "issues", "suggestion", "summary"}
-            if required.issubset(result.keys()):
-                result["score"] = int(result["score"])
-                if not isinstance(result["issues"], list):
-                    result["issues"] = [str(result["issues"])]
-                return result
-        except (json.JSONDecodeError, ValueError, KeyError):
-            pass
-
-        # 解析失败，返回包装结果
-        logger.warning("JSON解析失败，返回原始文本")
-        return {
-            "score": 0,
-            "issues": ["返回格式异常，无法解析"],
-            "suggestion": content,
-            "summary": "模型返回格式异常，请查看建议列中的原始输出",
-        }
+        raise LLMCallError(f"API调用失败，已重试{self.max_retries}次: {last_error}",
+                           last_error.kind, last_error.retry_after)
 
     def test_connection(self):
         """测试 API 连接是否正常。
@@ -137,3 +263,175 @@ class LLMClient:
             return True, f"连接成功，模型: {self.model}"
         except Exception as e:
             return False, f"连接失败: {e}"
+
+
+class AsyncLLMClient(BaseLLMClient):
+    """基于 AsyncOpenAI 的异步客户端。
+
+    所有请求共享一个 httpx 连接池（keep-alive，可用时启用 HTTP/2），
+    单个事件循环即可维持大量并发请求，无需每个请求占用一个线程。
+    每次调用只尝试一次，失败时抛出已分类的 LLMCallError，由调用方
+    （校验器的重试调度）决定是否以及何时重试；max_retries 为建议的总尝试次数。
+    使用完毕后需调用 close() 释放连接。
+
+    传入 hedge（HedgePolicy）时启用对冲请求：请求超过阈值仍未返回，就再发一个
+    相同请求（发往 hedge_client，缺省为本客户端），取先成功返回的结果。
+    hedge_client 随本客户端一起关闭。
+    """
+
+    def __init__(self, base_url, api_key, model, timeout=60, max_retries=3,
+                 max_connections=100, rate_limiter=None, on_attempt=None, cache=None,
+                 hedge=None, hedge_client=None):
+        super().__init__(model, timeout, max_retries, cache)
+        self.rate_limiter = rate_limiter
+        self.on_attempt = on_attempt  # (latency, error_kind)，成功时 error_kind 为 None
+        self.hedge = hedge
+        self.hedge_client = hedge_client
+        self.http_client = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+                keepalive_expiry=30,
+            ),
+        )
+        self.client = AsyncOpenAI(
+            base_url=base_url,
+            api_key=api_key,
+            timeout=timeout,
+            http_client=self.http_client,
+            max_retries=0,  # SDK 内部重试会占住并发名额且绕过限流统计
+        )
+
+    async def call(self, system_prompt, user_prompt, strict=False, check_cache=True):
+        """异步调用一次 LLM API，返回解析后的 JSON 结果。
+
+        Args:
+            strict: 为 True 时模型输出无法解析则抛出 PARSE 类错误（以便重试），
+                否则返回包装了原始输出的结果
+            check_cache: 为 False 时不查缓存（调用方已查过），结果仍写入缓存
+
+        Raises:
+            LLMCallError: 调用失败
+        """
+        if check_cache:
+            cached = self.cached(system_prompt, user_prompt)
+            if cached is not None:
+                return cached
+
+        content, model = await self._request(system_prompt, user_prompt)
+        result = self._try_parse(content)
+        if result is None:
+            if strict:
+                raise LLMCallError("模型返回格式异常，无法解析", ErrorKind.PARSE)
+            return self._parse_response(content)
+        if self.cache:
+            self.cache.put(self._cache_key(system_prompt, user_prompt, model), content)
+        return result
+
+    async def call_batch(self, system_prompt, user_prompt, count, row_prompts=None):
+        """一次请求校验 count 组翻译（提示词由 format_batch_prompt 生成）。
+
+        批量提示词随分组变化（增删一行会改变之后所有批次），因此不按整批缓存，
+        而是把解析成功的各行按其单行请求的提示词逐行写入缓存，由调用方逐行查找。
+
+        Args:
+            row_prompts: 各行单独请求时的 (系统提示词, 用户提示词)，None 表示不缓存
+
+        Returns:
+            list: 长度为 count 的结果列表，无法解析的条目为 None，由调用方单独重试
+
+        Raises:
+            LLMCallError: 调用失败
+        """
+        content, model = await self._request(system_prompt, user_prompt,
+                                              COMPLETION_TOKENS_ESTIMATE * count)
+        results = self._parse_batch_response(content, count)
+        if self.cache and row_prompts:
+            for (row_system, row_user), result in zip(row_prompts, results):
+                if result is not None:
+                    self.cache.put(self._cache_key(row_system, row_user, model),
+                                   json.dumps(result, ensure_ascii=False))
+        return results
+
+    async def _request(self, system_prompt, user_prompt,
+                       completion_tokens=COMPLETION_TOKENS_ESTIMATE):
+        """发送请求（启用对冲时可能发出两个）。
+
+        Returns:
+            tuple: (模型输出的原始文本, 给出该输出的模型)，对冲请求先返回时为
+                hedge_client 的模型，缓存按此区分
+        """
+        args = (system_prompt, user_prompt, completion_tokens)
+        if self.hedge is None:
+            return await self._request_once(*args), self.model
+
+        hedge = self.hedge
+        hedge.requests += 1
+        started = time.monotonic()
+        primary = asyncio.ensure_future(self._request_once(*args))
+        tasks = [primary]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=hedge.delay())
+            if done:
+                return primary.result(), self.model
+
+            hedge.hedged += 1
+            backup = self.hedge_client or self
+            logger.info(f"请求已等待 {time.monotonic() - started:.1f} 秒，发出对冲请求")
+            tasks.append(asyncio.ensure_future(backup._request_once(*args)))
+            pending = set(tasks)
+            errors = {}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        errors[task] = task.exception()
+                        continue
+                    if task is not primary:
+                        elapsed = time.monotonic() - started
+                        hedge.record(elapsed)  # 原请求至少要这么久
+                        hedge.record_win(elapsed)
+                    return task.result(), (self if task is primary else backup).model
+            # 两个请求都失败时以原请求的错误为准
+            raise errors[primary]
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _request_once(self, system_prompt, user_prompt,
+                            completion_tokens=COMPLETION_TOKENS_ESTIMATE):
+        """发送一次请求（含客户端限流），返回模型输出的原始文本。"""
+        estimated = (estimate_tokens(system_prompt) + estimate_tokens(user_prompt)
+                     + completion_tokens)
+        if self.rate_limiter:
+            await self.rate_limiter.acquire(estimated)
+        started = time.monotonic()
+        try:
+            response = await self.client.chat.completions.create(
+                model=self.model,
+                messages=self._messages(system_prompt, user_prompt),
+                temperature=self.temperature,
+            )
+            content = response.choices[0].message.content.strip()
+        except Exception as e:
+            error = to_call_error(e)
+            if self.on_attempt:
+                self.on_attempt(time.monotonic() - started, error.kind)
+            logger.warning(f"API调用失败 ({error.kind}): {e}")
+            raise error from e
+        latency = time.monotonic() - started
+        if self.on_attempt:
+            self.on_attempt(latency, None)
+        if self.hedge:
+            self.hedge.record(latency)
+        if self.rate_limiter and response.usage:
+            self.rate_limiter.record_usage(estimated, response.usage.total_tokens)
+        return content
+
+    async def close(self):
+        """关闭底层连接池。"""
+        if self.hedge_client:
+            await self.hedge_client.close()
+        await self.http_client.aclose()
@@ -2,16 +2,43 @@
 
 import json
 import os
-import time
+import asyncio
 import logging
+import heapq
+import hashlib
 import threading
-from datetime import datetime
-
-from core.api_client import LLMClient
-from core.prompts import get_prompt, format_prompt
+from array import array
+from itertools import islice
+
+from core.errors import ErrorKind, LLMCallError
+from core.retry import retry_delay
+from core.hedging import HedgePolicy
+from core.provider_pool import ProviderPool, resolve_provider
+from core.rate_limiter import RateLimiter
+from core.concurrency import AdaptiveConcurrency, ConcurrencyGate, percentile
+from core.result_store import ResultStore, RunStatus
+from core.result_index import ResultIndex
+from core.response_cache import ResponseCache
+from core.incremental_export import IncrementalExporter
+from core.prompts import get_prompt, format_prompt, format_batch_prompt, BATCH_SYSTEM_SUFFIX
 
 logger = logging.getLogger(__name__)
 
+# 原文+译文超过该长度的行不参与批量打包，单独请求
+BATCH_MAX_CHARS = 500
+
+# 一组行因暂无可用服务商而等待的次数上限，超过后按普通失败计入尝试次数
+MAX_UNAVAILABLE_WAITS = 100
+
+# 流水线队列容量：下游处理不过来时上游阻塞等待，内存占用有上限
+READ_CHUNK_ROWS = 256      # 读取阶段每次从行迭代器取出的行数
+ORDER_QUEUE_ROWS = 2000    # 已读取、等待按序记录的行
+RECORD_QUEUE_ROWS = 1000   # 等待写入结果库的行
+PROGRESS_QUEUE_ROWS = 1000  # 等待回调进度的行
+WRITE_CHUNK_ROWS = 500     # 写入/回调阶段每次最多处理的行数
+
+_END = object()  # 队列结束标记
+
 
 class CheckerState:
     """校验状态枚举。"""
@@ -26,18 +53,30 @@ class CheckerState:
 class TranslationChecker:
     """翻译校验调度器。"""
 
-    def __init__(self, checkpoint_dir):
+    def __init__(self, checkpoint_dir, cache_max_entries=100000):
         self.checkpoint_dir = checkpoint_dir
         os.makedirs(checkpoint_dir, exist_ok=True)
 
+        self.store = ResultStore(os.path.join(checkpoint_dir, "results.db"))
+        self.cache = ResponseCache(os.path.join(checkpoint_dir, "response_cache.db"),
+                                   max_entries=cache_max_entries)
+        self.run_id = None  # 当前（或最近一次）运行在结果库中的 ID
+        self.results = ResultIndex()  # 当前运行已完成的结果，随校验进度实时更新
+        self.latencies = array("d")  # 当前运行每次成功请求的耗时（秒）
+        self.retries = 0  # 当前运行重新排队的请求次数
+        self.hedge = None  # 当前运行的 HedgePolicy（含对冲统计），未启用对冲时为 None
+        self.pool = None  # 当前运行的 ProviderPool，只有一个服务商时为 None
+        self.concurrency_window = 0  # 当前允许的在途请求数（自适应并发时动态变化）
+
         self.state = CheckerState.IDLE
-        self.results = []
         self._thread = None
         self._lock = threading.Lock()
+        self._loop = None  # 校验线程的事件循环，运行期间有效
+        self._pipe = None  # 当前运行的流水线状态
 
         # 回调函数
         self.on_progress = None      # (current, total, result_dict)
-        self.on_complete = None      # (results)
+        self.on_complete = None      # (results: ResultIndex)
         self.on_error = None         # (error_message)
         self.on_state_change = None  # (new_state)
         self.on_log = None           # (message)
@@ -52,192 +91,730 @@ class TranslationChecker:
         if self.on_log:
             self.on_log(msg)
 
-    def get_checkpoint_path(self, excel_path):
-        """根据 Excel 文件名生成 checkpoint 路径。"""
-        base = os.path.splitext(os.path.basename(excel_path))[0]
-        return os.path.join(self.checkpoint_dir, f"{base}_checkpoint.json")
-
     def load_checkpoint(self, excel_path):
-        """加载断点数据。
+        """查找该 Excel 文件未完成的运行。
 
         Returns:
-            dict or None: {"completed_rows": [...], "results": [...]} 或 None
+            dict or None: {"run_id": ..., "completed_rows": [...]} 或 None
         """
-        cp_path = self.get_checkpoint_path(excel_path)
-        if not os.path.exists(cp_path):
+        run = self.store.find_unfinished_run(excel_path)
+        if run is None:
+            run = self._import_legacy_checkpoint(excel_path)
+        if run is None:
             return None
-        try:
-            with open(cp_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            return data
-        except Exception as e:
-            logger.warning(f"加载checkpoint失败: {e}")
-            return None
-
-    def save_checkpoint(self, excel_path, completed_rows, results):
-        """保存断点数据。"""
-        cp_path = self.get_checkpoint_path(excel_path)
-        data = {
-            "excel_path": excel_path,
-            "timestamp": datetime.now().isoformat(),
-            "completed_rows": completed_rows,
-            "results": results,
+        return {
+            "run_id": run["id"],
+            "completed_rows": list(self.store.completed_rows(run["id"])),
         }
-        with open(cp_path, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
 
     def delete_checkpoint(self, excel_path):
-        """删除断点文件。"""
-        cp_path = self.get_checkpoint_path(excel_path)
-        if os.path.exists(cp_path):
+        """放弃该 Excel 文件未完成的运行。"""
+        while True:
+            run = self.store.find_unfinished_run(excel_path)
+            if run is None:
+                break
+            self.store.delete_run(run["id"])
+        self._import_legacy_checkpoint(excel_path, discard=True)
+
+    def close(self):
+        """等待校验线程结束（运行中须先 stop），关闭结果库和响应缓存。"""
+        if self._thread:
+            self._thread.join()
+        self.store.close()
+        self.cache.close()
+
+    def discard_run(self, run_id):
+        """结果文件写出后删除该运行及其逐行结果，结果库不长期保留已完成的运行。"""
+        self.store.delete_run(run_id)
+
+    def _import_legacy_checkpoint(self, excel_path, discard=False):
+        """将旧版 checkpoint 文件（*_checkpoint.json / .jsonl）导入结果库并删除。
+
+        Returns:
+            dict or None: 导入后生成的运行记录
+        """
+        base = os.path.splitext(os.path.basename(excel_path))[0]
+        run = None
+        for ext in ("json", "jsonl"):
+            cp_path = os.path.join(self.checkpoint_dir, f"{base}_checkpoint.{ext}")
+            if not os.path.exists(cp_path):
+                continue
+            if not discard and run is None:
+                try:
+                    results = self._read_legacy_checkpoint(cp_path)
+                except Exception as e:
+                    logger.warning(f"加载checkpoint失败: {e}")
+                    continue
+                run_id = self.store.create_run(excel_path, None, None, 0)
+                self.store.add_results(run_id, results)
+                self.store.set_run_status(run_id, RunStatus.STOPPED)
+                run = self.store.get_run(run_id)
+                logger.info(f"已导入旧版checkpoint: {cp_path}")
             os.remove(cp_path)
+        return run
+
+    @staticmethod
+    def _read_legacy_checkpoint(cp_path):
+        if cp_path.endswith(".json"):
+            with open(cp_path, "r", encoding="utf-8") as f:
+                return json.load(f)["results"]
 
-    def start(self, data, excel_path, prompt_name, custom_prompt, api_config, resume=False):
+        results = {}
+        with open(cp_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if "row" in record:
+                    results[record["row"]] = record
+        return list(results.values())
+
+    def start(self, data, excel_path, prompt_name, custom_prompt, api_config, resume=False,
+              concurrency=1, adaptive=False, batch_size=1, total=None, export_path=None):
         """启动校验任务。
 
         Args:
-            data: Excel 数据列表
-            excel_path: Excel 文件路径（用于 checkpoint 命名）
+            data: Excel 数据列表，或 iter_excel 返回的惰性行迭代器
+            excel_path: Excel 文件路径（用于查找未完成的运行）
             prompt_name: 提示词模板名称，如果是自定义则为 None
             custom_prompt: 自定义提示词 dict {"system": ..., "user": ...}，非自定义时为 None
-            api_config: API 配置 {"base_url", "api_key", "model"}
+            api_config: API 配置 {"base_url", "api_key", "model"}，
+                可选 "rpm"/"tpm" 限流额度（0 或缺省表示不限），
+                "use_cache" 是否使用响应缓存（缺省为是），
+                "hedge_percentile" 对冲请求的延迟分位（如 95，0 或缺省表示不对冲），
+                "hedge_base_url"/"hedge_api_key"/"hedge_model" 对冲请求的备用服务商
+                （缺省发往同一服务商，Key 和模型缺省同主服务商），
+                "provider" 主服务商名称，"extra_providers" 参与负载均衡的其他服务商列表
+                （格式见 provider_pool.resolve_provider）
             resume: 是否从断点续传
+            concurrency: 并发请求数，1 表示逐行串行校验；自适应时为上限
+            adaptive: 是否根据延迟和限流/服务端错误自动调整并发数
+            batch_size: 每次请求打包校验的行数，1 表示逐行请求
+            total: 总行数（用于进度显示），缺省时取 len(data)
+            export_path: 增量导出的 CSV 路径，每完成一行即追加写入；None 表示不导出
         """
         if self.state == CheckerState.RUNNING:
             return
 
+        if total is None:
+            total = len(data) if hasattr(data, "__len__") else 0
+
+        run_id = None
+        if resume:
+            cp = self.load_checkpoint(excel_path)
+            if cp:
+                run_id = cp["run_id"]
+        if run_id is None:
+            run_id = self.store.create_run(excel_path, prompt_name,
+                                           api_config["model"], total)
+        else:
+            self.store.set_run_status(run_id, RunStatus.RUNNING)
+        self.run_id = run_id
+        self.results = ResultIndex()  # 续传时由校验线程载入已有结果，不阻塞界面线程
+
         self._set_state(CheckerState.RUNNING)
 
         self._thread = threading.Thread(
             target=self._run,
-            args=(data, excel_path, prompt_name, custom_prompt, api_config, resume),
+            args=(data, total, run_id, prompt_name, custom_prompt, api_config,
+                  max(1, int(concurrency)), adaptive, max(1, int(batch_size)), export_path),
             daemon=True,
         )
         self._thread.start()
 
     def pause(self):
-        """暂停校验。"""
+        """暂停校验：不再发出新请求，在途请求照常完成。"""
         if self.state == CheckerState.RUNNING:
             self._set_state(CheckerState.PAUSED)
+            self._notify_loop()
             self._log("校验已暂停")
 
     def resume_running(self):
         """恢复校验。"""
         if self.state == CheckerState.PAUSED:
             self._set_state(CheckerState.RUNNING)
+            self._notify_loop()
             self._log("校验已恢复")
 
     def stop(self):
-        """停止校验。"""
+        """停止校验：立即取消在途请求（包括重试等待），已完成的行写入结果库后结束。"""
         if self.state in (CheckerState.RUNNING, CheckerState.PAUSED):
             self._set_state(CheckerState.STOPPING)
+            self._notify_loop()
             self._log("正在停止校验...")
 
-    def _run(self, data, excel_path, prompt_name, custom_prompt, api_config, resume):
-        """校验主循环（在子线程中运行）。"""
+    def _notify_loop(self):
+        """通知校验线程的事件循环状态已变化（可从任意线程调用）。"""
+        loop = self._loop
+        if loop is None:
+            return
         try:
-            client = LLMClient(
-                base_url=api_config["base_url"],
-                api_key=api_config["api_key"],
-                model=api_config["model"],
-            )
+            loop.call_soon_threadsafe(self._apply_state)
+        except RuntimeError:
+            pass  # 事件循环已结束
+
+    def _apply_state(self):
+        """在事件循环中执行：按当前状态放行/挡住请求阶段，停止时取消在途请求。"""
+        pipe = self._pipe
+        if pipe is None:
+            return
+        if self.state == CheckerState.PAUSED:
+            pipe.running.clear()
+        else:
+            pipe.running.set()
+        if self.state == CheckerState.STOPPING and pipe.in_flight:
+            self._log(f"取消 {len(pipe.in_flight)} 个进行中的请求")
+            for task in pipe.in_flight:
+                task.cancel()
+        pipe.wake.set()
+
+    async def _check_job(self, pipe, client, system_prompt, user_template, items, attempt):
+        """执行一次请求（单行或一组行），把结果交给各行对应的 Future。
+
+        可重试的失败不在此等待，而是交给重试调度，延迟后重新排队，当前请求名额
+        立即让给其他行。整批失败或批量结果中解析失败的行拆成单行重新请求。
+        鉴权/余额错误会结束本次运行。
 
-            # 获取提示词模板
-            if custom_prompt:
-                system_prompt = custom_prompt["system"]
-                user_template = custom_prompt["user"]
+        Returns:
+            bool: 总是 True（被取消时由 _Pipeline.track 返回 None）
+        """
+        max_attempts = client.max_retries
+        check_cache = attempt == 1
+        if check_cache and len(items) > 1:
+            items = self._resolve_cached(pipe, client, system_prompt, user_template, items)
+            if not items:
+                return True
+            check_cache = False  # 已逐行查过
+        rows_text = (f"{items[0]['row']}" if len(items) == 1
+                     else f"{items[0]['row']}-{items[-1]['row']}")
+        try:
+            if len(items) == 1:
+                item = items[0]
+                results = [await client.call(
+                    system_prompt, format_prompt(user_template, item["source"], item["target"]),
+                    strict=attempt < max_attempts, check_cache=check_cache)]
             else:
-                prompt = get_prompt(prompt_name)
-                if prompt is None:
-                    raise ValueError(f"未找到提示词模板: {prompt_name}")
-                system_prompt = prompt["system"]
-                user_template = prompt["user"]
-
-            # 加载断点
-            completed_rows = set()
-            self.results = []
-            if resume:
-                cp = self.load_checkpoint(excel_path)
-                if cp:
-                    completed_rows = set(cp["completed_rows"])
-                    self.results = cp["results"]
-                    self._log(f"从断点恢复，已完成 {len(completed_rows)} 行")
-
-            total = len(data)
-            processed = len(completed_rows)
-
-            for item in data:
-                # 检查停止信号
-                if self.state == CheckerState.STOPPING:
-                    self._log(f"校验已停止，已完成 {processed}/{total}")
-                    self.save_checkpoint(excel_path,
-                                         list(completed_rows), self.results)
-                    self._set_state(CheckerState.IDLE)
-                    return
-
-                # 等待暂停恢复
-                while self.state == CheckerState.PAUSED:
-                    time.sleep(0.5)
-
-                if self.state == CheckerState.STOPPING:
-                    self._log(f"校验已停止，已完成 {processed}/{total}")
-                    self.save_checkpoint(excel_path,
-                                         list(completed_rows), self.results)
-                    self._set_state(CheckerState.IDLE)
-                    return
-
-                # 跳过已完成行
-                if item["row"] in completed_rows:
-                    continue
-
-                # 构造用户提示词
-                user_prompt = format_prompt(
-                    user_template, item["source"], item["target"]
-                )
-
-                # 调用 API
-                self._log(f"正在校验第 {item['row']} 行 ({processed + 1}/{total})...")
-                try:
-                    result = client.call(system_prompt, user_prompt)
-                except Exception as e:
-                    result = {
-                        "score": 0,
-                        "issues": [f"API调用失败: {e}"],
-                        "suggestion": "",
-                        "summary": "API调用失败",
-                    }
-                    self._log(f"第 {item['row']} 行校验失败: {e}")
-
-                # 记录结果
-                item_result = {
-                    "row": item["row"],
-                    "source": item["source"],
-                    "target": item["target"],
-                    "result": result,
-                }
-                self.results.append(item_result)
-                completed_rows.add(item["row"])
-                processed += 1
-
-                # 保存断点
-                self.save_checkpoint(excel_path,
-                                     list(completed_rows), self.results)
-
-                # 回调进度
-                if self.on_progress:
-                    self.on_progress(processed, total, item_result)
-
-            # 全部完成
-            self._log(f"校验完成，共处理 {total} 行")
-            self.delete_checkpoint(excel_path)
-            self._set_state(CheckerState.COMPLETED)
-
-            if self.on_complete:
-                self.on_complete(self.results)
+                row_prompts = [(system_prompt, format_prompt(user_template, item["source"],
+                                                             item["target"]))
+                               for item in items]
+                results = await client.call_batch(system_prompt + BATCH_SYSTEM_SUFFIX,
+                                                  format_batch_prompt(user_template, items),
+                                                  len(items), row_prompts)
+        except Exception as e:
+            error = e if isinstance(e, LLMCallError) else LLMCallError(str(e))
+            if error.fatal:
+                self._abort(pipe, f"API调用失败（{error.kind}）: {error}")
+                for item in items:
+                    pipe.resolve(item, None)
+            elif error.kind == ErrorKind.UNAVAILABLE and pipe.wait_unavailable(items):
+                # 暂无可用服务商，请求没有发出，不计入尝试次数
+                pipe.schedule(items, attempt, retry_delay(attempt, error.retry_after))
+            elif error.retryable and attempt < max_attempts:
+                delay = retry_delay(attempt, error.retry_after)
+                logger.info(f"第 {rows_text} 行请求失败（{error.kind}），"
+                            f"{delay:.1f} 秒后第 {attempt + 1} 次尝试")
+                pipe.schedule(items, attempt + 1, delay)
+            elif len(items) > 1:
+                self._log(f"第 {rows_text} 行批量校验失败，改为逐行校验: {error}")
+                for item in items:
+                    pipe.schedule([item])
+            else:
+                self._log(f"第 {rows_text} 行校验失败: {error}")
+                pipe.resolve(items[0], {
+                    "score": 0,
+                    "issues": [f"API调用失败: {error}"],
+                    "suggestion": "",
+                    "summary": "API调用失败",
+                })
+            return True
+
+        retry = [item for item, result in zip(items, results) if result is None]
+        if retry:
+            self._log(f"批量结果中 {len(retry)} 行解析失败，改为逐行校验")
+            for item in retry:
+                pipe.schedule([item])
+        for item, result in zip(items, results):
+            if result is not None:
+                pipe.resolve(item, result)
+        return True
+
+    @staticmethod
+    def _resolve_cached(pipe, client, system_prompt, user_template, items):
+        """批量请求前逐行查响应缓存，命中的行直接交给 Future，返回仍需请求的行。"""
+        remaining = []
+        for item in items:
+            result = client.cached(
+                system_prompt, format_prompt(user_template, item["source"], item["target"]))
+            if result is None:
+                remaining.append(item)
+            else:
+                pipe.resolve(item, result)
+        return remaining
+
+    def _abort(self, pipe, message):
+        """遇到对所有行都会失败的错误（鉴权、余额）时按停止处理，结束后报告错误。"""
+        if pipe.fatal is None:
+            pipe.fatal = message
+            self._log(f"{message}，停止校验")
+            self._set_state(CheckerState.STOPPING)
+            self._apply_state()
 
+    def _run(self, data, total, run_id, prompt_name, custom_prompt, api_config,
+             concurrency, adaptive, batch_size, export_path):
+        """校验线程入口：在本线程的事件循环中运行 _run_async。"""
+        try:
+            asyncio.run(self._run_async(data, total, run_id, prompt_name, custom_prompt,
+                                        api_config, concurrency, adaptive, batch_size,
+                                        export_path))
         except Exception as e:
             logger.exception("校验过程发生异常")
             self._log(f"校验异常: {e}")
+            self.store.set_run_status(run_id, RunStatus.ERROR)
             self._set_state(CheckerState.ERROR)
             if self.on_error:
                 self.on_error(str(e))
+
+    async def _run_async(self, data, total, run_id, prompt_name, custom_prompt, api_config,
+                         concurrency, adaptive, batch_size, export_path=None):
+        """校验主流程：由有界队列连接的流水线。
+
+            读取 → 请求（concurrency 个 worker）→ 排序 → 写入结果库/导出 → 进度回调
+
+        各阶段并行推进，任一阶段处理不过来时上游在队列上阻塞等待（背压），
+        整体吞吐只取决于最慢的阶段，内存占用也有上限。读取、写入和进度回调
+        在线程中执行，慢磁盘或慢回调不会阻塞事件循环中的网络请求。
+
+        data 可以是列表或惰性的行迭代器。重复的原文/译文对只校验一次；去重后的行
+        按 batch_size 分组，每组一次请求，最多同时保持 concurrency 个请求在途
+        （自适应时由 AIMD 窗口决定）。结果按原始行顺序记录。
+        """
+        # 获取提示词模板
+        if custom_prompt:
+            system_prompt = custom_prompt["system"]
+            user_template = custom_prompt["user"]
+        else:
+            prompt = get_prompt(prompt_name)
+            if prompt is None:
+                raise ValueError(f"未找到提示词模板: {prompt_name}")
+            system_prompt = prompt["system"]
+            user_template = prompt["user"]
+
+        # 加载断点：已有结果全部载入结果索引（供界面按行号查看，内存占用与结果行数成正比）
+        completed_rows = self.store.completed_rows(run_id)
+        if completed_rows:
+            self.results.extend(self.store.iter_results(run_id))
+            self._log(f"从断点恢复，已完成 {len(completed_rows)} 行")
+
+        # 增量导出：续传时先写入结果库中已有的结果
+        exporter = None
+        if export_path:
+            exporter = IncrementalExporter(export_path)
+            exporter.open(self.results)
+            self._log(f"结果将实时写入: {export_path}")
+
+        if batch_size > 1:
+            self._log(f"批量校验，每次请求最多 {batch_size} 行")
+        controller = None
+        if adaptive and concurrency > 1:
+            controller = AdaptiveConcurrency(initial=max(1, concurrency // 4),
+                                             maximum=concurrency)
+            self._log(f"自适应并发校验，并发上限: {concurrency}")
+        elif concurrency > 1:
+            self._log(f"并发校验，并发数: {concurrency}")
+        gate = ConcurrencyGate(controller.limit if controller else concurrency)
+        self.concurrency_window = gate.limit
+
+        self.latencies = array("d")
+        self.retries = 0
+
+        def on_attempt(latency, error_kind):
+            if error_kind is None:
+                self.latencies.append(latency)
+            if controller:
+                controller.record(latency, error_kind)
+                gate.limit = self.concurrency_window = controller.limit
+
+        from core.api_client import AsyncLLMClient  # 延迟加载 openai SDK，加快程序启动
+
+        # 对冲请求：超过延迟分位数仍未返回时再发一次，可发往备用服务商
+        self.hedge = hedge_client = None
+        hedge_percentile = api_config.get("hedge_percentile", 0)
+        if hedge_percentile:
+            self.hedge = HedgePolicy(hedge_percentile / 100)
+            if api_config.get("hedge_base_url"):
+                hedge_client = AsyncLLMClient(
+                    base_url=api_config["hedge_base_url"],
+                    api_key=api_config.get("hedge_api_key") or api_config["api_key"],
+                    model=api_config.get("hedge_model") or api_config["model"],
+                    max_connections=concurrency,
+                )
+            target = f"发往 {api_config['hedge_base_url']}" if hedge_client else "重发"
+            self._log(f"对冲请求：超过 p{hedge_percentile} 延迟仍未返回时{target}")
+
+        # 主服务商在前，其后为负载均衡的其他服务商
+        endpoints = [{
+            "name": api_config.get("provider") or "主服务商",
+            "base_url": api_config["base_url"],
+            "api_key": api_config["api_key"],
+            "model": api_config["model"],
+            "rpm": api_config.get("rpm", 0),
+            "tpm": api_config.get("tpm", 0),
+        }] + [resolve_provider(entry) for entry in api_config.get("extra_providers") or ()]
+        use_cache = api_config.get("use_cache", True)
+
+        def make_client(endpoint, on_attempt):
+            rate_limiter = RateLimiter(rpm=endpoint["rpm"], tpm=endpoint["tpm"])
+            if rate_limiter.enabled:
+                prefix = f"{endpoint['name']} " if len(endpoints) > 1 else ""
+                self._log(f"{prefix}客户端限流: RPM {rate_limiter.rpm or '不限'}, "
+                          f"TPM {rate_limiter.tpm or '不限'}")
+            return AsyncLLMClient(
+                base_url=endpoint["base_url"],
+                api_key=endpoint["api_key"],
+                model=endpoint["model"],
+                max_connections=concurrency,
+                rate_limiter=rate_limiter,
+                on_attempt=on_attempt,
+                cache=self.cache if use_cache else None,
+                hedge=self.hedge,
+                # 备用对冲服务商只挂在主服务商上，避免重复关闭
+                hedge_client=hedge_client if endpoint is endpoints[0] else None,
+            )
+
+        if len(endpoints) > 1:
+            self.pool = client = ProviderPool(endpoints, make_client, on_attempt)
+            self._log("多服务商负载均衡: " + ", ".join(e["name"] for e in endpoints))
+        else:
+            self.pool = None
+            client = make_client(endpoints[0], on_attempt)
+        self.cache.reset_stats()
+
+        # 逐行读取，跳过已完成行
+        rows = (item for item in data if item["row"] not in completed_rows)
+        pipe = _Pipeline(concurrency, batch_size, processed=len(completed_rows))
+        self._loop = asyncio.get_running_loop()
+        self._pipe = pipe
+        self._apply_state()  # 启动前可能已被暂停或停止
+        stages = [
+            self._read_stage(pipe, rows, batch_size),
+            *(self._call_stage(pipe, client, gate, system_prompt, user_template, total)
+              for _ in range(concurrency)),
+            self._retry_stage(pipe, workers=concurrency),
+            self._order_stage(pipe),
+            self._checkpoint_stage(pipe, run_id, exporter),
+            self._progress_stage(pipe, total),
+        ]
+        tasks = [asyncio.create_task(stage) for stage in stages]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            # 任一阶段出错时取消其余阶段，再把异常抛给 _run
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        finally:
+            self._loop = self._pipe = None
+            await client.close()
+            if exporter:
+                exporter.close()
+
+        processed = pipe.processed
+        self.retries = pipe.retries
+        if pipe.recorded > pipe.unique:
+            self._log(f"去重后共请求 {pipe.unique} 组（共 {pipe.recorded} 行，"
+                      f"重复率 {1 - pipe.unique / pipe.recorded:.0%}）")
+
+        if client.cache:
+            self._log(self.cache.stats_message())
+
+        if pipe.retries:
+            self._log(f"共重新排队请求 {pipe.retries} 次")
+
+        if self.hedge:
+            self._log(self.hedge.stats_message())
+
+        if self.pool:
+            self._log(self.pool.stats_message())
+
+        if self.latencies:
+            message = (f"请求延迟 p50 {percentile(self.latencies, 0.5):.1f}s, "
+                       f"p90 {percentile(self.latencies, 0.9):.1f}s, "
+                       f"p99 {percentile(self.latencies, 0.99):.1f}s")
+            if controller:
+                message += f", 最终并发窗口 {controller.limit}"
+            self._log(message)
+
+        if pipe.fatal:
+            self.store.set_run_status(run_id, RunStatus.ERROR)
+            self._set_state(CheckerState.ERROR)
+            if self.on_error:
+                self.on_error(pipe.fatal)
+            return
+
+        if self.state == CheckerState.STOPPING:
+            # 已完成行均已写入结果库
+            self._log(f"校验已停止，已完成 {processed}/{total}")
+            self.store.set_run_status(run_id, RunStatus.STOPPED)
+            self._set_state(CheckerState.IDLE)
+            return
+
+        # 全部完成
+        self._log(f"校验完成，共处理 {processed} 行")
+        self.store.set_run_status(run_id, RunStatus.COMPLETED)
+        self._set_state(CheckerState.COMPLETED)
+
+        if self.on_complete:
+            self.on_complete(self.results)
+
+    # ── 流水线各阶段 ──
+
+    async def _read_stage(self, pipe, rows, batch_size):
+        """读取阶段：在线程中分块读取行，去重后分组放入请求队列，并按原始顺序放入排序队列。
+
+        尚未写入的行中已出现过的原文/译文对不再重复请求，与首次出现的行共用一个结果
+        （已全部写入的原文/译文对不再保留，之后再出现时重新请求，通常命中响应缓存）。
+        原文+译文过长的行单独成组。停止时不再读取新行。
+        """
+        loop = asyncio.get_running_loop()
+        batch = []
+        while self.state != CheckerState.STOPPING:
+            chunk = await asyncio.to_thread(lambda: list(islice(rows, READ_CHUNK_ROWS)))
+            if not chunk:
+                break
+            for item in chunk:
+                key = _pair_key(item)
+                pipe.waiting[key] = pipe.waiting.get(key, 0) + 1
+                if key not in pipe.resolved:
+                    pipe.resolved[key] = loop.create_future()
+                    pipe.unique += 1
+                    if len(item["source"]) + len(item["target"]) > BATCH_MAX_CHARS:
+                        await pipe.submit([item])
+                    else:
+                        batch.append(item)
+                        if len(batch) >= batch_size:
+                            await pipe.submit(batch)
+                            batch = []
+                if batch and pipe.ordered.full():
+                    # 排序阶段可能正在等待这组未凑满的行，先发出，避免互相等待
+                    await pipe.submit(batch)
+                    batch = []
+                await pipe.ordered.put(item)
+        if batch:
+            await pipe.submit(batch)
+        await pipe.ordered.put(_END)
+        pipe.read_done = True
+        pipe.wake.set()
+
+    async def _call_stage(self, pipe, client, gate, system_prompt, user_template, total):
+        """请求阶段（多个 worker）：取出一个请求任务执行，直到收到结束标记。
+
+        在途请求数由 gate 限制；暂停时等待 pipe.running。停止后取出的任务不再请求，
+        被取消的在途请求也一样，结果记为 None。
+        """
+        while True:
+            job = await pipe.batches.get()
+            if job is _END:
+                return
+            batch, attempt = job
+            async with gate:
+                await pipe.running.wait()
+                done = None
+                if self.state != CheckerState.STOPPING:
+                    if attempt == 1:
+                        rows_text = (f"{batch[0]['row']}" if len(batch) == 1
+                                     else f"{batch[0]['row']}-{batch[-1]['row']}")
+                        self._log(f"正在校验第 {rows_text} 行 ({pipe.processed}/{total})...")
+                    done = await pipe.track(self._check_job(
+                        pipe, client, system_prompt, user_template, batch, attempt))
+            if done is None:
+                for item in batch:
+                    pipe.resolve(item, None)
+            pipe.job_done()
+
+    async def _retry_stage(self, pipe, workers):
+        """重试调度阶段：把到期的重试任务放回请求队列。
+
+        读取结束且所有请求任务（含待重试的）都处理完后，通知请求 worker 结束。
+        停止时丢弃尚未到期的重试。
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            pipe.wake.clear()
+            if self.state == CheckerState.STOPPING:
+                for _, _, batch, _ in pipe.delayed:
+                    for item in batch:
+                        pipe.resolve(item, None)
+                    pipe.job_done()
+                pipe.delayed.clear()
+            while pipe.delayed and pipe.delayed[0][0] <= loop.time():
+                _, _, batch, attempt = heapq.heappop(pipe.delayed)
+                await pipe.batches.put((batch, attempt))
+            if pipe.read_done and pipe.pending == 0:
+                break
+            timeout = pipe.delayed[0][0] - loop.time() if pipe.delayed else None
+            try:
+                await asyncio.wait_for(pipe.wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        for _ in range(workers):
+            await pipe.batches.put(_END)
+
+    async def _order_stage(self, pipe):
+        """排序阶段：按原始行顺序等待每行的结果，交给写入阶段。
+
+        先完成的行在此等待前序行；遇到因停止而未校验的行后，其后的行全部丢弃，
+        保证结果库中的已完成行是连续的。
+        """
+        stopped = False
+        while True:
+            item = await pipe.ordered.get()
+            if item is _END:
+                break
+            if stopped:
+                continue
+            key = _pair_key(item)
+            result = await pipe.resolved[key]
+            pipe.release(key)
+            if result is None:
+                stopped = True
+                continue
+            pipe.recorded += 1
+            await pipe.records.put({
+                "row": item["row"],
+                "source": item["source"],
+                "target": item["target"],
+                "result": dict(result),
+            })
+        await pipe.records.put(_END)
+
+    async def _checkpoint_stage(self, pipe, run_id, exporter):
+        """写入阶段：在线程中成批写入结果库（每批一个事务）、结果索引和增量导出文件。"""
+        while True:
+            chunk, finished = await _take_chunk(pipe.records)
+            if chunk:
+                await asyncio.to_thread(self._save_results, run_id, exporter, chunk)
+                for item_result in chunk:
+                    await pipe.progress.put(item_result)
+            if finished:
+                await pipe.progress.put(_END)
+                return
+
+    def _save_results(self, run_id, exporter, item_results):
+        self.store.add_results(run_id, item_results)
+        self.results.extend(item_results)
+        if exporter:
+            for item_result in item_results:
+                exporter.append(item_result)
+
+    async def _progress_stage(self, pipe, total):
+        """进度阶段：在线程中依次回调 on_progress，慢回调只会让本阶段积压。"""
+        while True:
+            chunk, finished = await _take_chunk(pipe.progress)
+            if chunk:
+                await asyncio.to_thread(self._report_progress, pipe, total, chunk)
+            if finished:
+                return
+
+    def _report_progress(self, pipe, total, item_results):
+        for item_result in item_results:
+            pipe.processed += 1
+            if self.on_progress:
+                self.on_progress(pipe.processed, total, item_result)
+
+
+class _Pipeline:
+    """一次运行的流水线状态：连接各阶段的有界队列和计数。"""
+
+    def __init__(self, concurrency, batch_size, processed=0):
+        self.batches = asyncio.Queue(maxsize=concurrency * 2)  # 请求任务 (行组, 第几次尝试)
+        self.delayed = []   # 待重试的任务堆 (到期时间, 序号, 行组, 第几次尝试)
+        self.pending = 0    # 已提交尚未处理完的请求任务数（含待重试的）
+        self.retries = 0
+        self.read_done = False
+        self.wake = asyncio.Event()  # 通知重试调度：有新的重试、任务处理完或状态变化
+        self.fatal = None   # 导致运行结束的错误信息
+        self.ordered = asyncio.Queue(maxsize=max(ORDER_QUEUE_ROWS, batch_size * 2))
+        self.records = asyncio.Queue(maxsize=RECORD_QUEUE_ROWS)
+        self.progress = asyncio.Queue(maxsize=PROGRESS_QUEUE_ROWS)
+        # 原文/译文对的摘要 -> Future，结果为 None 表示因停止而未校验；
+        # 该对的行全部交给写入阶段后删除，内存占用只与未写入的行数有关
+        self.resolved = {}
+        self.waiting = {}   # 原文/译文对的摘要 -> 尚未交给写入阶段的行数
+        self.unique = 0     # 请求过的不同原文/译文对数
+        self.recorded = 0    # 本次运行写入的行数
+        self.processed = processed  # 已回调进度的行数（含续传前已完成的行）
+        self.running = asyncio.Event()  # 未暂停时置位，请求阶段据此等待
+        self.running.set()
+        self.in_flight = set()  # 进行中的请求任务，停止时全部取消
+        self.unavailable_waits = {}  # 行号 -> 因暂无可用服务商而等待的次数
+
+    async def submit(self, batch):
+        """提交一个新的请求任务（第一次尝试）。"""
+        self.pending += 1
+        await self.batches.put((batch, 1))
+
+    def schedule(self, batch, attempt=1, delay=0.0):
+        """delay 秒后重新请求这组行。"""
+        self.pending += 1
+        self.retries += 1
+        due = asyncio.get_running_loop().time() + delay
+        heapq.heappush(self.delayed, (due, self.retries, batch, attempt))
+        self.wake.set()
+
+    def job_done(self):
+        self.pending -= 1
+        if self.pending == 0:
+            self.wake.set()
+
+    def wait_unavailable(self, items):
+        """记录这组行又一次等待可用服务商，返回是否仍在上限之内。"""
+        row = items[0]["row"]
+        waits = self.unavailable_waits.get(row, 0) + 1
+        self.unavailable_waits[row] = waits
+        return waits <= MAX_UNAVAILABLE_WAITS
+
+    def resolve(self, item, result):
+        self.unavailable_waits.pop(item["row"], None)
+        future = self.resolved.get(_pair_key(item))
+        if future is not None and not future.done():
+            future.set_result(result)
+
+    def release(self, key):
+        """该原文/译文对又有一行交给了写入阶段，全部交出后删除其结果。"""
+        self.waiting[key] -= 1
+        if not self.waiting[key]:
+            del self.waiting[key]
+            del self.resolved[key]
+
+    async def track(self, coro):
+        """作为可取消的任务运行一次请求，被停止取消时返回 None。"""
+        task = asyncio.create_task(coro)
+        self.in_flight.add(task)
+        try:
+            await asyncio.wait({task})
+        finally:
+            self.in_flight.discard(task)
+            task.cancel()  # worker 自身被取消时一并取消请求；已完成时无作用
+        return None if task.cancelled() else task.result()
+
+
+def _pair_key(item):
+    """原文/译文对的摘要，用作去重的键，不必保留完整文本。"""
+    text = f"{item['source']}\0{item['target']}"
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+async def _take_chunk(queue, limit=WRITE_CHUNK_ROWS):
+    """等待至少一项，再顺带取出队列中已有的项（最多 limit 项）。
+
+    Returns:
+        tuple: (项列表, 是否已遇到结束标记)
+    """
+    items = [await queue.get()]
+    while len(items) < limit and not queue.empty():
+        items.append(queue.get_nowait())
+    if items[-1] is _END:
+        return items[:-1], True
+    return items, False
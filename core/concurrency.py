@@ -0,0 +1,138 @@
+"""自适应并发控制：根据请求延迟和限流/服务端错误动态调整在途请求数（AIMD）。"""
+
+import time
+import asyncio
+import logging
+from collections import deque
+
+from core.errors import ErrorKind
+
+logger = logging.getLogger(__name__)
+
+
+def percentile(values, q):
+    """返回 values 的 q 分位数（0-1），values 为空时返回 None。"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+class AdaptiveConcurrency:
+    """AIMD 并发窗口。
+
+    - 成功请求：窗口加性增长，每完成约一个窗口的请求 +1
+    - 429 / 5xx / 超时：窗口减半
+    - 延迟 p50 超过基准的 latency_tolerance 倍：窗口乘以 0.9
+    减小操作之间至少间隔一个请求往返时间，避免同一批请求的错误把窗口连续压到底。
+    """
+
+    def __init__(self, initial, minimum=1, maximum=64, sample_size=50,
+                 latency_tolerance=2.0):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.latency_tolerance = latency_tolerance
+        self._limit = float(min(max(initial, minimum), maximum))
+        self._latencies = deque(maxlen=sample_size)
+        self._baseline = None  # 观测到的最低 p50 延迟，缓慢上浮以适应服务端变化
+        self._last_decrease = 0.0
+
+    @property
+    def limit(self):
+        """当前允许的在途请求数。"""
+        return int(self._limit)
+
+    def percentile(self, q):
+        """最近样本的延迟分位数（秒），样本不足时返回 None。"""
+        return percentile(self._latencies, q)
+
+    def record(self, latency, error_kind=None):
+        """记录一次请求尝试的结果，作为 AsyncLLMClient 的 on_attempt 回调。"""
+        if error_kind in (ErrorKind.RATE_LIMIT, ErrorKind.SERVER):
+            self._decrease(0.5, f"请求{'被限流' if error_kind == ErrorKind.RATE_LIMIT else '出错'}")
+            return
+        if error_kind is not None:
+            # 其他错误（鉴权、参数等）与负载无关
+            return
+
+        self._latencies.append(latency)
+        if len(self._latencies) < 10:
+            self._increase()
+            return
+
+        p50 = self.percentile(0.5)
+        if self._baseline is None:
+            self._baseline = p50
+        else:
+            self._baseline = min(p50, self._baseline * 1.01)
+
+        if p50 > self._baseline * self.latency_tolerance:
+            self._decrease(0.9, f"延迟升高 (p50 {p50:.1f}s)")
+        else:
+            self._increase()
+
+    def _increase(self):
+        self._limit = min(self.maximum, self._limit + 1.0 / self._limit)
+
+    def _decrease(self, factor, reason):
+        now = time.monotonic()
+        cooldown = self.percentile(0.5) or 1.0
+        if now - self._last_decrease < cooldown:
+            return
+        self._last_decrease = now
+        old = self.limit
+        self._limit = max(self.minimum, self._limit * factor)
+        if self.limit != old:
+            logger.info(f"{reason}，并发窗口 {old} -> {self.limit}")
+
+
+class ConcurrencyGate:
+    """上限可随时调整的异步信号量，用于按 AdaptiveConcurrency 的窗口限制在途请求数。
+
+    用法: async with gate: ...；调大 limit 时立即唤醒等待者。
+    """
+
+    def __init__(self, limit):
+        self._limit = max(1, int(limit))
+        self._active = 0
+        self._waiters = deque()
+
+    @property
+    def limit(self):
+        return self._limit
+
+    @limit.setter
+    def limit(self, value):
+        self._limit = max(1, int(value))
+        self._wake()
+
+    async def acquire(self):
+        while self._active >= self._limit:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                # 已被唤醒却取消时，把名额让给下一个等待者
+                self._wake()
+                raise
+        self._active += 1
+
+    def release(self):
+        self._active -= 1
+        self._wake()
+
+    def _wake(self):
+        free = self._limit - self._active
+        while free > 0 and self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.release()
@@ -0,0 +1,43 @@
+"""API 错误分类（不依赖 openai SDK，具体归类见 api_client.classify_error）。"""
+
+
+class ErrorKind:
+    """API 错误分类。"""
+    RATE_LIMIT = "rate_limit"    # 429 限流
+    SERVER = "server"            # 5xx、超时、连接失败
+    AUTH = "auth"                # 401/403，API Key 无效或无权限
+    QUOTA = "quota"              # 余额/额度耗尽（402，或 429 insufficient_quota）
+    BAD_REQUEST = "bad_request"  # 400/404/422，如模型名错误、提示词过长
+    PARSE = "parse"              # 请求成功但模型输出无法解析
+    UNAVAILABLE = "unavailable"  # 暂无可用服务商（均在熔断或探测中），请求没有发出
+    OTHER = "other"
+
+
+# 可以稍后重试的错误
+RETRYABLE = frozenset({ErrorKind.RATE_LIMIT, ErrorKind.SERVER, ErrorKind.PARSE,
+                       ErrorKind.UNAVAILABLE, ErrorKind.OTHER})
+
+# 对所有行都会失败的错误，出现后立即结束本次运行
+FATAL = frozenset({ErrorKind.AUTH, ErrorKind.QUOTA})
+
+
+class LLMCallError(Exception):
+    """一次 API 调用失败。
+
+    Attributes:
+        kind: ErrorKind
+        retry_after: 服务端要求的等待秒数（Retry-After），没有则为 None
+    """
+
+    def __init__(self, message, kind=ErrorKind.OTHER, retry_after=None):
+        super().__init__(message)
+        self.kind = kind
+        self.retry_after = retry_after
+
+    @property
+    def retryable(self):
+        return self.kind in RETRYABLE
+
+    @property
+    def fatal(self):
+        return self.kind in FATAL
@@ -1,50 +1,255 @@
 """Excel 文件读写模块。"""
 
 import os
+import re
 import copy
 import logging
+import zipfile
 from openpyxl import Workbook, load_workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill, Alignment, Border, Side, NamedStyle
 from openpyxl.utils import get_column_letter
+from openpyxl.worksheet.dimensions import ColumnDimension
+
+from core.result_index import ResultIndex, score_bucket, LOW, MID
 
 logger = logging.getLogger(__name__)
 
+# 原文件包含这些部件或工作表元素时，流式复制会丢失内容，回退为完整加载
+_FULL_LOAD_PARTS = ("xl/drawings/", "xl/charts/", "xl/tables/", "xl/pivotTables/",
+                    "xl/comments", "xl/externalLinks/", "xl/vbaProject.bin")
+_FULL_LOAD_TAGS = (b"mergeCells", b"dataValidations", b"conditionalFormatting",
+                   b"hyperlinks", b"drawing", b"tableParts", b"autoFilter", b"sheetProtection",
+                   b'hidden="1"', b'hidden="true"',
+                   b'customHeight="1"', b'customHeight="true"')
 
-def read_excel(path):
-    """读取 Excel 文件，提取前两列（中文原文、英文译文）。
 
-    Args:
-        path: Excel 文件路径
+def iter_excel(path):
+    """逐行读取 Excel 文件的前两列（中文原文、英文译文），按需惰性产出。
 
-    Returns:
-        list[dict]: [{"row": 1, "source": "中文", "target": "English"}, ...]
+    使用 openpyxl 只读模式，内存占用与总行数无关；迭代结束或生成器被回收时关闭文件。
+
+    Yields:
+        dict: {"row": 2, "source": "中文", "target": "English"}
     """
     wb = load_workbook(path, read_only=True)
-    ws = wb.active
-    data = []
+    try:
+        ws = wb.active
+        for idx, row in enumerate(ws.iter_rows(min_row=2, values_only=True), start=2):
+            # 跳过空行
+            if not row or len(row) < 2:
+                continue
+            source = str(row[0]).strip() if row[0] is not None else ""
+            target = str(row[1]).strip() if row[1] is not None else ""
+            if source or target:
+                yield {"row": idx, "source": source, "target": target}
+    finally:
+        wb.close()
 
-    for idx, row in enumerate(ws.iter_rows(min_row=2, values_only=True), start=2):
-        # 跳过空行
-        if not row or len(row) < 2:
-            continue
-        source = str(row[0]).strip() if row[0] is not None else ""
-        target = str(row[1]).strip() if row[1] is not None else ""
-        if source or target:
-            data.append({"row": idx, "source": source, "target": target})
 
-    wb.close()
-    logger.info(f"读取了 {len(data)} 行数据 (从 {path})")
-    return data
+def count_excel_rows(path):
+    """根据工作表尺寸信息估算数据行数（不含表头），通常无需解析全部单元格。
+
+    部分程序（如 openpyxl 只写模式）生成的文件缺少尺寸信息，此时扫描一遍工作表计算。
+
+    Returns:
+        int: 估算的行数（可能包含空行）
+    """
+    wb = load_workbook(path, read_only=True)
+    try:
+        ws = wb.active
+        max_row = ws.max_row
+        if max_row is None:
+            max_row = 0
+            for max_row, _ in enumerate(ws.iter_rows(values_only=True), start=1):
+                pass
+    finally:
+        wb.close()
+    return max(0, max_row - 1)
 
 
 def write_results_to_excel(original_path, results, output_path):
     """在原始 Excel 基础上追加结果列，保存为新文件。
 
+    原文件只有一个工作表且不含合并单元格、图表、批注、筛选、工作表保护、隐藏行列、
+    自定义行高等元素时，以只读模式逐行读取、只写模式逐行写出（保留单元格样式、列宽和
+    冻结窗格）；否则回退为完整加载。
+
     Args:
         original_path: 原始 Excel 文件路径
-        results: 结果列表 [{"row": 2, "source": ..., "target": ..., "result": {...}}, ...]
+        results: ResultIndex，或结果列表 [{"row": 2, "source": ..., "target": ..., "result": {...}}, ...]
         output_path: 输出文件路径
     """
+    results = ResultIndex.of(results)
+    sheet_info = _inspect_for_streaming(original_path)
+    if sheet_info is None:
+        _write_results_full_load(original_path, results, output_path)
+    else:
+        _write_results_streaming(original_path, results, output_path, sheet_info)
+
+
+def _inspect_for_streaming(path):
+    """检查原文件能否流式复制。
+
+    Returns:
+        dict or None: {"cols": [(min, max, width), ...], "freeze": "A2" 或 None}，
+        需要完整加载时返回 None
+    """
+    try:
+        with zipfile.ZipFile(path) as archive:
+            names = archive.namelist()
+            blocker = next((n for n in names if n.startswith(_FULL_LOAD_PARTS)), None)
+            sheets = [n for n in names
+                      if n.startswith("xl/worksheets/") and n.endswith(".xml")]
+            if blocker or len(sheets) != 1:
+                logger.info(f"原文件包含{blocker or '多个工作表'}，使用完整加载方式写入")
+                return None
+
+            prefix = b""
+            tail = b""
+            overlap = max(len(tag) for tag in _FULL_LOAD_TAGS)
+            with archive.open(sheets[0]) as src:
+                while True:
+                    chunk = src.read(1 << 20)
+                    if not chunk:
+                        break
+                    if b"<sheetData" not in prefix:
+                        prefix += chunk
+                    data = tail + chunk
+                    tag = next((t for t in _FULL_LOAD_TAGS if t in data), None)
+                    if tag:
+                        logger.info(f"原文件包含 {tag.decode()}，使用完整加载方式写入")
+                        return None
+                    tail = data[-overlap:]
+    except (zipfile.BadZipFile, OSError) as e:
+        logger.info(f"无法检查原文件结构 ({e})，使用完整加载方式写入")
+        return None
+
+    # <sheetData> 之前的部分包含列宽和冻结窗格信息
+    prefix = prefix.split(b"<sheetData", 1)[0].decode("utf-8", "ignore")
+    cols = []
+    for m in re.finditer(r"<col\b([^>]*)>", prefix):
+        attrs = dict(re.findall(r'(\w+)="([^"]*)"', m.group(1)))
+        if "style" in attrs:
+            logger.info("原文件设置了整列样式，使用完整加载方式写入")
+            return None
+        if "width" in attrs:
+            cols.append((int(attrs["min"]), int(attrs["max"]), float(attrs["width"])))
+    freeze = None
+    pane = re.search(r"<pane\b([^>]*)>", prefix)
+    if pane:
+        attrs = dict(re.findall(r'(\w+)="([^"]*)"', pane.group(1)))
+        if attrs.get("state") == "frozen":
+            freeze = attrs.get("topLeftCell")
+    return {"cols": cols, "freeze": freeze}
+
+
+def _annotation_styles():
+    """结果列使用的命名样式。"""
+    thin_border = Border(
+        left=Side(style="thin"),
+        right=Side(style="thin"),
+        top=Side(style="thin"),
+        bottom=Side(style="thin"),
+    )
+
+    header = NamedStyle(name="result_header")
+    header.fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
+    header.font = Font(bold=True, color="FFFFFF", size=11)
+    header.alignment = Alignment(horizontal="center")
+    header.border = thin_border
+
+    normal = NamedStyle(name="result_cell")
+    normal.alignment = Alignment(wrap_text=True, vertical="top")
+    normal.border = thin_border
+
+    low = NamedStyle(name="result_score_low")
+    low.alignment = Alignment(wrap_text=True, vertical="top")
+    low.border = thin_border
+    low.font = Font(color="FF0000", bold=True)
+
+    return [header, normal, low]
+
+
+def _write_results_streaming(original_path, results, output_path, sheet_info):
+    """流式复制原工作表并追加结果列。"""
+    src_wb = load_workbook(original_path, read_only=True)
+    try:
+        src_ws = src_wb.active
+        if src_ws.max_column is None:
+            # 部分程序生成的文件缺少尺寸信息，需先完整扫描一遍
+            src_ws.calculate_dimension(force=True)
+        max_col = src_ws.max_column
+
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet(src_ws.title)
+        for style in _annotation_styles():
+            wb.add_named_style(style)
+
+        # 列宽、冻结窗格（只写模式下须在写入数据前设置）；
+        # 原列宽范围截断到 max_col，不与结果列的列宽重叠
+        for col_min, col_max, width in sheet_info["cols"]:
+            if col_min > max_col:
+                continue
+            ws.column_dimensions[get_column_letter(col_min)] = ColumnDimension(
+                ws, min=col_min, max=min(col_max, max_col), width=width, customWidth=True)
+        for i in range(4):
+            ws.column_dimensions[get_column_letter(max_col + 1 + i)].width = 30 if i > 0 else 8
+        if sheet_info["freeze"]:
+            ws.freeze_panes = sheet_info["freeze"]
+
+        def styled(value, style):
+            cell = WriteOnlyCell(ws, value=value)
+            cell.style = style
+            return cell
+
+        # 原单元格样式按样式 ID 缓存，同一样式只转换一次
+        style_cache = {}
+
+        def copy_cell(src):
+            if not getattr(src, "has_style", False):
+                return src.value
+            template = style_cache.get(src._style_id)
+            if template is None:
+                template = WriteOnlyCell(ws)
+                template.font = copy.copy(src.font)
+                template.fill = copy.copy(src.fill)
+                template.border = copy.copy(src.border)
+                template.alignment = copy.copy(src.alignment)
+                template.protection = copy.copy(src.protection)
+                template.number_format = src.number_format
+                style_cache[src._style_id] = template
+            cell = WriteOnlyCell(ws, value=src.value)
+            cell._style = copy.copy(template._style)
+            return cell
+
+        headers = ["评分", "问题", "修改建议", "总结"]
+        for row_num, row in enumerate(
+                src_ws.iter_rows(min_row=1, min_col=1, max_col=max_col), start=1):
+            cells = [copy_cell(c) for c in row]
+            cells.extend([None] * (max_col - len(cells)))
+
+            if row_num == 1:
+                cells.extend(styled(h, "result_header") for h in headers)
+            elif row_num in results:
+                result = results.result_for(row_num)
+                score = result.get("score", "")
+                issues = "\n".join(result.get("issues", []))
+                low = score_bucket(score) == LOW
+                cells.append(styled(score, "result_score_low" if low else "result_cell"))
+                cells.extend(styled(val, "result_cell") for val in (
+                    issues, result.get("suggestion", ""), result.get("summary", "")))
+            ws.append(cells)
+
+        wb.save(output_path)
+    finally:
+        src_wb.close()
+
+    logger.info(f"结果已写入: {output_path}")
+
+
+def _write_results_full_load(original_path, results, output_path):
+    """完整加载原始工作簿后追加结果列（保留所有工作表和格式，但速度慢、占用内存大）。"""
     wb = load_workbook(original_path)
     ws = wb.active
 
@@ -69,13 +274,10 @@ def write_results_to_excel(original_path, results, output_path):
         cell.alignment = Alignment(horizontal="center")
         cell.border = thin_border
 
-    # 构建行号到结果的映射
-    result_map = {}
-    for r in results:
-        result_map[r["row"]] = r.get("result", {})
-
     # 写入结果数据
-    for row_num, result in result_map.items():
+    for item_result in results:
+        row_num = item_result["row"]
+        result = item_result["result"]
         score = result.get("score", "")
         issues = "\n".join(result.get("issues", []))
         suggestion = result.get("suggestion", "")
@@ -88,7 +290,7 @@ def write_results_to_excel(original_path, results, output_path):
             cell.border = thin_border
 
             # 低分标红
-            if i == 0 and isinstance(score, int) and score <= 5:
+            if i == 0 and score_bucket(score) == LOW:
                 cell.font = Font(color="FF0000", bold=True)
 
     # 调整列宽
@@ -101,76 +303,85 @@ def write_results_to_excel(original_path, results, output_path):
     logger.info(f"结果已写入: {output_path}")
 
 
-def write_independent_report(data, results, output_path):
-    """生成独立的结果报告 Excel。
-
-    Args:
-        data: 原始数据列表
-        results: 结果列表
-        output_path: 输出文件路径
-    """
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "翻译校验报告"
-
-    # 表头样式
-    header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-    header_font = Font(bold=True, color="FFFFFF", size=11)
+def _report_styles():
+    """独立报告使用的命名样式（整个工作簿共享，避免逐单元格创建样式对象）。"""
     thin_border = Border(
         left=Side(style="thin"),
         right=Side(style="thin"),
         top=Side(style="thin"),
         bottom=Side(style="thin"),
     )
-    red_fill = PatternFill(start_color="FFC7CE", end_color="FFC7CE", fill_type="solid")
-    yellow_fill = PatternFill(start_color="FFEB9C", end_color="FFEB9C", fill_type="solid")
+    cell_alignment = Alignment(wrap_text=True, vertical="top")
 
-    headers = ["行号", "中文原文", "英文译文", "评分", "问题", "修改建议", "总结"]
-    for col, header in enumerate(headers, start=1):
-        cell = ws.cell(row=1, column=col, value=header)
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = Alignment(horizontal="center")
-        cell.border = thin_border
+    header = NamedStyle(name="report_header")
+    header.fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
+    header.font = Font(bold=True, color="FFFFFF", size=11)
+    header.alignment = Alignment(horizontal="center")
+    header.border = thin_border
 
-    # 构建结果映射
-    result_map = {}
-    for r in results:
-        result_map[r["row"]] = r.get("result", {})
+    normal = NamedStyle(name="report_cell")
+    normal.alignment = cell_alignment
+    normal.border = thin_border
 
-    # 写入数据
-    for row_idx, item in enumerate(data, start=2):
-        result = result_map.get(item["row"], {})
-        score = result.get("score", "")
-        issues = "\n".join(result.get("issues", []))
-        suggestion = result.get("suggestion", "")
-        summary = result.get("summary", "")
+    low = NamedStyle(name="report_cell_low")
+    low.alignment = cell_alignment
+    low.border = thin_border
+    low.fill = PatternFill(start_color="FFC7CE", end_color="FFC7CE", fill_type="solid")
 
-        row_data = [item["row"], item["source"], item["target"],
-                     score, issues, suggestion, summary]
+    mid = NamedStyle(name="report_cell_mid")
+    mid.alignment = cell_alignment
+    mid.border = thin_border
+    mid.fill = PatternFill(start_color="FFEB9C", end_color="FFEB9C", fill_type="solid")
+
+    return [header, normal, low, mid]
 
-        for col, val in enumerate(row_data, start=1):
-            cell = ws.cell(row=row_idx, column=col, value=val)
-            cell.alignment = Alignment(wrap_text=True, vertical="top")
-            cell.border = thin_border
 
-        # 根据评分设置行背景色
-        if isinstance(score, int):
-            if score <= 5:
-                for col in range(1, len(headers) + 1):
-                    ws.cell(row=row_idx, column=col).fill = red_fill
-            elif score <= 7:
-                for col in range(1, len(headers) + 1):
-                    ws.cell(row=row_idx, column=col).fill = yellow_fill
+def write_report_rows(item_results, output_path):
+    """按顺序把已合并原文/译文的结果写成独立报告 Excel。
 
-    # 设置列宽
+    使用 openpyxl 只写（流式）模式逐行写出，内存占用不随行数增长。
+
+    Args:
+        item_results: 结果字典的可迭代对象，每项包含 row/source/target/result，
+            如结果库的 iter_results
+        output_path: 输出文件路径
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("翻译校验报告")
+    for style in _report_styles():
+        wb.add_named_style(style)
+
+    # 设置列宽、冻结首行（只写模式下须在写入数据前设置）
     widths = [6, 40, 40, 8, 30, 30, 30]
     for i, w in enumerate(widths, start=1):
         ws.column_dimensions[get_column_letter(i)].width = w
-
-    # 冻结首行
     ws.freeze_panes = "A2"
 
+    def styled_row(values, style):
+        row = []
+        for val in values:
+            cell = WriteOnlyCell(ws, value=val)
+            cell.style = style
+            row.append(cell)
+        return row
+
+    headers = ["行号", "中文原文", "英文译文", "评分", "问题", "修改建议", "总结"]
+    ws.append(styled_row(headers, "report_header"))
+
+    # 写入数据，根据评分设置行背景色
+    for item in item_results:
+        result = item.get("result", {})
+        score = result.get("score", "")
+        issues = "\n".join(result.get("issues", []))
+        suggestion = result.get("suggestion", "")
+        summary = result.get("summary", "")
+
+        style = {LOW: "report_cell_low", MID: "report_cell_mid"}.get(
+            score_bucket(score), "report_cell")
+
+        ws.append(styled_row([item["row"], item["source"], item["target"],
+                              score, issues, suggestion, summary], style))
+
     wb.save(output_path)
     wb.close()
     logger.info(f"独立报告已生成: {output_path}")
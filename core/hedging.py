@@ -0,0 +1,65 @@
+"""对冲请求：请求耗时超过近期延迟的某个分位数仍未返回时，再发一个相同的请求，取先返回者。
+
+用于削减长尾延迟（少数特别慢的请求拖长整次运行）。代价是多消耗对冲请求的 token，
+因此只在积累足够延迟样本后启用，并限制对冲请求占总请求的比例。
+"""
+
+from collections import deque
+
+from core.concurrency import percentile
+
+
+class HedgePolicy:
+    """对冲阈值计算与统计。
+
+    Args:
+        quantile: 触发对冲的延迟分位数（0-1），如 0.95 表示超过 p95 仍未返回时对冲
+        min_samples: 至少积累这么多个延迟样本后才开始对冲
+        sample_size: 计算阈值使用的最近样本数
+        max_rate: 对冲请求占总请求数的上限
+        min_delay: 阈值下限（秒），避免延迟很低时几乎每个请求都被对冲
+    """
+
+    def __init__(self, quantile, min_samples=20, sample_size=200, max_rate=0.1,
+                 min_delay=0.05):
+        self.quantile = quantile
+        self.min_samples = min_samples
+        self.max_rate = max_rate
+        self.min_delay = min_delay
+        self._latencies = deque(maxlen=sample_size)
+
+        self.requests = 0        # 经过对冲判断的请求数
+        self.hedged = 0          # 发出了对冲请求的次数
+        self.wins = 0            # 对冲请求先返回的次数
+        self.saved_seconds = 0.0  # 对冲先返回时估计节省的时间之和
+
+    def record(self, latency):
+        """记录一次请求的耗时（被对冲取消的请求记录取消时已等待的时间）。"""
+        self._latencies.append(latency)
+
+    def delay(self):
+        """返回本次请求应在多少秒后对冲，不对冲时返回 None。"""
+        if len(self._latencies) < self.min_samples:
+            return None
+        if self.hedged >= self.requests * self.max_rate:
+            return None
+        return max(self.min_delay, percentile(self._latencies, self.quantile))
+
+    def record_win(self, elapsed):
+        """对冲请求先返回：原请求已等待 elapsed 秒仍未完成。
+
+        节省时间按样本中耗时超过 elapsed 的请求的平均耗时估计（被取消的请求
+        以取消时的耗时计入样本，因此是偏低的估计）。
+        """
+        self.wins += 1
+        slower = [latency for latency in self._latencies if latency > elapsed]
+        if slower:
+            self.saved_seconds += sum(slower) / len(slower) - elapsed
+
+    @property
+    def hedge_rate(self):
+        return self.hedged / self.requests if self.requests else 0.0
+
+    def stats_message(self):
+        return (f"对冲请求 {self.hedged} 次（占 {self.hedge_rate:.1%}），"
+                f"其中对冲先返回 {self.wins} 次，估计节省 {self.saved_seconds:.1f} 秒请求时间")
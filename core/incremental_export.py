@@ -0,0 +1,66 @@
+"""校验过程中的增量结果导出：每完成一行即追加到 CSV 旁路文件。
+
+运行中途停止或程序崩溃时，已完成的结果仍可直接用 Excel 打开。
+该文件只供查看，校验完成后的报告由结果库生成。
+"""
+
+import csv
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ["行号", "中文原文", "英文译文", "评分", "问题", "修改建议", "总结"]
+
+
+class IncrementalExporter:
+    """按完成顺序把结果逐行追加到 CSV 文件（UTF-8 BOM，Excel 可直接打开）。
+
+    写入有缓冲，至少每 flush_interval 秒落盘一次，关闭时全部落盘。
+    """
+
+    def __init__(self, path, flush_interval=1.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.count = 0
+        self._file = None
+        self._writer = None
+        self._last_flush = 0.0
+
+    def open(self, existing=()):
+        """新建（覆盖）导出文件，先写入 existing 中已有的结果（续传时使用）。"""
+        self._file = open(self.path, "w", encoding="utf-8-sig", newline="")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(COLUMNS)
+        self.count = 0
+        for item_result in existing:
+            self.append(item_result)
+        self.flush()
+
+    def append(self, item_result):
+        result = item_result.get("result", {})
+        self._writer.writerow([
+            item_result["row"],
+            item_result["source"],
+            item_result["target"],
+            result.get("score", ""),
+            "\n".join(result.get("issues", [])),
+            result.get("suggestion", ""),
+            result.get("summary", ""),
+        ])
+        self.count += 1
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        if self._file:
+            self._file.flush()
+            self._last_flush = time.monotonic()
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+            self._writer = None
+            logger.info(f"增量结果已保存: {self.path}（{self.count} 行）")
+
@@ -115,3 +115,30 @@ def format_prompt(prompt_template, source_text, target_text):
     return (prompt_template
             .replace("{source_text}", source_text)
             .replace("{target_text}", target_text))
+
+
+# 批量校验时追加到系统提示词末尾，要求模型按编号返回结果数组
+BATCH_SYSTEM_SUFFIX = """
+
+当一次给出多组带编号的翻译时，请对每一组分别评估，返回一个 JSON 数组，
+数组中每个元素对应一组翻译，除上述字段外还需包含 "id" 字段（该组的编号），
+按编号顺序排列，不要返回任何其他内容。"""
+
+
+def format_batch_prompt(prompt_template, items):
+    """将多组原文/译文打包成一条批量校验的用户提示词。
+
+    模板中的占位符替换为对各组的引用，待校验内容以编号列表附在后面。
+
+    Args:
+        prompt_template: 单行校验使用的用户提示词模板
+        items: [{"source": ..., "target": ...}, ...]
+    """
+    instructions = format_prompt(prompt_template, "（见下方各组的中文原文）",
+                                 "（见下方各组的英文译文）")
+    parts = [f"以下共有 {len(items)} 组中英文翻译，请按要求逐组校验。\n\n{instructions}\n"]
+    for i, item in enumerate(items, start=1):
+        parts.append(f"[{i}]\n中文原文：\n{item['source']}\n\n英文译文：\n{item['target']}\n")
+    parts.append(f"请返回包含 {len(items)} 个元素的 JSON 数组，"
+                 f"每个元素带有对应的 id（1 到 {len(items)}）。")
+    return "\n".join(parts)
@@ -0,0 +1,280 @@
+"""多服务商负载均衡：按实时延迟和错误率加权分配请求，熔断并定期探测异常的服务商。
+
+ProviderPool 与 AsyncLLMClient 的 call/call_batch/cached/close 约定一致，校验器可直接替换使用。
+某个服务商失败时错误照常抛给重试调度，重试会按更新后的权重落到其他服务商上。
+"""
+
+import time
+import random
+import logging
+
+from core.errors import ErrorKind, LLMCallError
+from core.providers import PRESET_PROVIDERS
+
+logger = logging.getLogger(__name__)
+
+# 计入熔断的错误类型（与 AdaptiveConcurrency 视为负载相关的一致）
+LOAD_ERRORS = frozenset({ErrorKind.RATE_LIMIT, ErrorKind.SERVER})
+
+
+def resolve_provider(entry):
+    """补全服务商配置：name 为预置服务商时，缺省的 base_url/model/rpm/tpm 取预置值。
+
+    Args:
+        entry: {"name", "base_url", "api_key", "model", "rpm", "tpm"}，除 api_key 外均可省略
+    """
+    preset = PRESET_PROVIDERS.get(entry.get("name"), {})
+    return {
+        "name": entry.get("name") or entry.get("base_url", ""),
+        "base_url": entry.get("base_url") or preset.get("base_url", ""),
+        "api_key": entry.get("api_key", ""),
+        "model": entry.get("model") or preset.get("default_model", ""),
+        "rpm": entry.get("rpm", preset.get("rpm", 0)),
+        "tpm": entry.get("tpm", preset.get("tpm", 0)),
+    }
+
+
+class CircuitBreaker:
+    """单个服务商的熔断器。
+
+    连续失败 failure_threshold 次后熔断（open），cooldown 秒内不分配请求；
+    冷却结束后放行一个探测请求（half-open），成功则恢复，失败则冷却时间加倍；
+    探测请求返回前其他请求每隔 probe_wait 秒再来查看一次。
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=5, cooldown=30.0, max_cooldown=300.0, probe_wait=1.0):
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.probe_wait = probe_wait
+        self.state = self.CLOSED
+        self.failures = 0  # 连续失败次数
+        self.cooldown = cooldown
+        self._opened_at = 0.0
+        self._probing = False
+
+    def available(self):
+        """当前是否可以分配请求（冷却结束时转为 half-open）。"""
+        if self.state == self.OPEN and self.retry_in() == 0:
+            self.state = self.HALF_OPEN
+            self._probing = False
+        if self.state == self.HALF_OPEN:
+            return not self._probing
+        return self.state == self.CLOSED
+
+    def retry_in(self):
+        """距离可以分配请求还需等待的秒数。"""
+        if self.state == self.HALF_OPEN:
+            return self.probe_wait if self._probing else 0.0
+        if self.state != self.OPEN:
+            return 0.0
+        return max(0.0, self._opened_at + self.cooldown - time.monotonic())
+
+    def on_dispatch(self):
+        """分配一个请求，返回它是否占用了探测名额。"""
+        if self.state == self.HALF_OPEN:
+            self._probing = True
+            return True
+        return False
+
+    def on_cancel(self):
+        """探测请求没有发出（被取消、对冲请求先返回）时不计结果，探测名额放回。"""
+        self._probing = False
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+        self.cooldown = self.base_cooldown
+        self._probing = False
+
+    def record_rejected(self):
+        """服务商有响应但拒绝了这个请求（与负载无关，如 400）：探测请求视为已恢复。"""
+        if self.state == self.HALF_OPEN:
+            self.record_success()
+
+    def record_failure(self):
+        """记录一次失败，返回是否因此熔断。"""
+        self.failures += 1
+        if self.state == self.HALF_OPEN:
+            self.cooldown = min(self.max_cooldown, self.cooldown * 2)
+        elif self.state != self.CLOSED or self.failures < self.failure_threshold:
+            return False
+        self.state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._probing = False
+        return True
+
+
+class Provider:
+    """池中的一个服务商：客户端、熔断器和实时统计（指数滑动平均）。"""
+
+    def __init__(self, name, alpha=0.2):
+        self.name = name
+        self.client = None
+        self.breaker = CircuitBreaker()
+        self.alpha = alpha
+        self.latency = None     # 平均请求耗时（秒，含客户端限流等待）
+        self.error_rate = 0.0   # 平均失败率
+        self.requests = 0       # HTTP 请求次数
+        self.errors = 0
+        self.disabled = None    # 鉴权/余额错误时记录原因，之后不再分配请求
+
+    def record_attempt(self, error_kind):
+        """作为客户端的 on_attempt 回调统计每次 HTTP 请求的结果。
+
+        所有失败都计入失败率（降低权重）；只有限流和服务端错误这类与负载相关的
+        失败计入熔断，个别行被拒绝（400/404/422，如内容审核、提示词过长）不会熔断，
+        但说明服务商能正常响应，探测请求据此结束。
+        """
+        self.requests += 1
+        failed = error_kind is not None
+        self.error_rate += self.alpha * (failed - self.error_rate)
+        if not failed:
+            self.breaker.record_success()
+            return
+        self.errors += 1
+        if error_kind not in LOAD_ERRORS:
+            self.breaker.record_rejected()
+            return
+        if self.breaker.record_failure():
+            logger.warning(f"服务商 {self.name} 连续失败，暂停分配请求 "
+                           f"{self.breaker.cooldown:.0f} 秒")
+
+    def record_latency(self, latency):
+        if self.latency is None:
+            self.latency = latency
+        else:
+            self.latency += self.alpha * (latency - self.latency)
+
+    def weight(self, default_latency):
+        """分配权重：成功率越高、耗时越短权重越大（约为单个并发名额的有效吞吐）。"""
+        latency = self.latency if self.latency is not None else default_latency
+        return (1.0 - self.error_rate) ** 2 / max(latency, 0.05) + 1e-6
+
+    @property
+    def status(self):
+        if self.disabled:
+            return "已停用"
+        return {CircuitBreaker.CLOSED: "正常", CircuitBreaker.OPEN: "熔断",
+                CircuitBreaker.HALF_OPEN: "探测中"}[self.breaker.state]
+
+
+class ProviderPool:
+    """多个 OpenAI 兼容服务商组成的客户端池。
+
+    Args:
+        endpoints: resolve_provider 补全后的服务商配置列表，第一个为主服务商
+        make_client: (endpoint, on_attempt) -> AsyncLLMClient，由调用方构造客户端，
+            本模块因此不依赖 openai SDK
+        on_attempt: 每次 HTTP 请求后额外回调 (latency, error_kind)，如自适应并发控制
+    """
+
+    def __init__(self, endpoints, make_client, on_attempt=None):
+        self.providers = []
+        for endpoint in endpoints:
+            provider = Provider(endpoint["name"])
+            provider.client = make_client(endpoint, self._attempt_hook(provider, on_attempt))
+            self.providers.append(provider)
+        primary = self.providers[0].client
+        self.cache = primary.cache
+        self.max_retries = primary.max_retries
+
+    @staticmethod
+    def _attempt_hook(provider, on_attempt):
+        def hook(latency, error_kind):
+            provider.record_attempt(error_kind)
+            if on_attempt:
+                on_attempt(latency, error_kind)
+        return hook
+
+    async def call(self, system_prompt, user_prompt, strict=False, check_cache=True):
+        if check_cache:
+            cached = self.cached(system_prompt, user_prompt)
+            if cached is not None:
+                return cached
+        provider = self._choose()
+        return await self._dispatch(provider, provider.client.call(
+            system_prompt, user_prompt, strict=strict, check_cache=False))
+
+    async def call_batch(self, system_prompt, user_prompt, count, row_prompts=None):
+        provider = self._choose()
+        return await self._dispatch(provider, provider.client.call_batch(
+            system_prompt, user_prompt, count, row_prompts))
+
+    async def close(self):
+        for provider in self.providers:
+            await provider.client.close()
+
+    def cached(self, system_prompt, user_prompt):
+        """选择服务商之前先查响应缓存，任一未停用服务商的模型命中即可。"""
+        if not self.cache:
+            return None
+        models = list(dict.fromkeys(p.client.model for p in self.providers if not p.disabled))
+        if not models:
+            return None
+        return self.providers[0].client.cached(system_prompt, user_prompt, models)
+
+    def _choose(self):
+        """按权重随机选择一个可用的服务商。
+
+        Raises:
+            LLMCallError: 全部停用（AUTH，结束运行）或全部熔断/探测中
+                （UNAVAILABLE，等到最早可分配时重试，不计入该行的尝试次数）
+        """
+        enabled = [p for p in self.providers if not p.disabled]
+        if not enabled:
+            raise LLMCallError("所有服务商均已停用: " + "; ".join(
+                f"{p.name}: {p.disabled}" for p in self.providers), ErrorKind.AUTH)
+        candidates = [p for p in enabled if p.breaker.available()]
+        if not candidates:
+            wait = min(p.breaker.retry_in() for p in enabled)
+            raise LLMCallError("所有服务商均已熔断", ErrorKind.UNAVAILABLE, retry_after=wait)
+
+        known = [p.latency for p in candidates if p.latency is not None]
+        default_latency = sum(known) / len(known) if known else 1.0
+        weights = [p.weight(default_latency) for p in candidates]
+        return random.choices(candidates, weights)[0]
+
+    async def _dispatch(self, provider, coro):
+        probe = provider.breaker.on_dispatch()
+        requests = provider.requests
+        started = time.monotonic()
+        try:
+            result = await coro
+        except LLMCallError as e:
+            if e.fatal and not provider.disabled:
+                provider.disabled = f"{e.kind}: {e}"
+                logger.warning(f"服务商 {provider.name} 已停用（{e.kind}）: {e}")
+            if e.fatal and any(not p.disabled for p in self.providers):
+                # 其他服务商仍可用：转为可重试错误，由重试调度改派
+                raise LLMCallError(f"服务商 {provider.name} 已停用: {e}",
+                                   ErrorKind.SERVER) from e
+            raise
+        finally:
+            # 没有向该服务商发出请求（被取消、对冲请求先返回）：探测名额放回，
+            # 否则熔断器会一直停在探测中
+            if probe and provider.requests == requests:
+                provider.breaker.on_cancel()
+        if provider.requests > requests:
+            provider.record_latency(time.monotonic() - started)
+        return result
+
+    def stats(self):
+        """各服务商的统计，供运行统计输出。"""
+        return [{
+            "name": p.name,
+            "requests": p.requests,
+            "errors": p.errors,
+            "latency": round(p.latency, 3) if p.latency is not None else None,
+            "status": p.status,
+        } for p in self.providers]
+
+    def stats_message(self):
+        return "; ".join(
+            f"{p.name}: 请求 {p.requests} 次, 失败 {p.errors} 次, "
+            f"平均耗时 {p.latency or 0:.1f}s, {p.status}"
+            for p in self.providers)
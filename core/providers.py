@@ -0,0 +1,42 @@
+"""服务商预置配置（不依赖 openai SDK，界面可直接导入）。"""
+
+# rpm/tpm 为默认模型的常见限额（每分钟请求数/token 数），实际额度随账户等级不同，
+# 可在设置中修改；0 表示不限流（如 DeepSeek 不设固定限额）
+PRESET_PROVIDERS = {
+    "OpenAI": {
+        "base_url": "https://api.openai.com/v1",
+        "default_model": "gpt-4o",
+        "rpm": 500,
+        "tpm": 30000,
+    },
+    "DeepSeek": {
+        "base_url": "https://api.deepseek.com/v1",
+        "default_model": "deepseek-chat",
+        "rpm": 0,
+        "tpm": 0,
+    },
+    "通义千问": {
+        "base_url": "https://dashscope.aliyuncs.com/compatible-mode/v1",
+        "default_model": "qwen-plus",
+        "rpm": 1200,
+        "tpm": 1000000,
+    },
+    "Moonshot (Kimi)": {
+        "base_url": "https://api.moonshot.cn/v1",
+        "default_model": "moonshot-v1-8k",
+        "rpm": 200,
+        "tpm": 128000,
+    },
+    "智谱 (GLM)": {
+        "base_url": "https://open.bigmodel.cn/api/paas/v4",
+        "default_model": "glm-4",
+        "rpm": 0,
+        "tpm": 0,
+    },
+    "自定义": {
+        "base_url": "",
+        "default_model": "",
+        "rpm": 0,
+        "tpm": 0,
+    },
+}
@@ -0,0 +1,87 @@
+"""客户端限流：按每分钟请求数（RPM）和每分钟 token 数（TPM）对请求进行节流。"""
+
+import time
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 预估单次回复的 token 数（JSON 评分结果通常在此范围内），实际用量返回后再校正
+COMPLETION_TOKENS_ESTIMATE = 300
+
+
+def estimate_tokens(text):
+    """粗略估算文本的 token 数：中文约每字 1 个，其他字符约每 4 个 1 个。"""
+    cjk = sum(1 for ch in text if "\u4e00" <= ch <= "\u9fff")
+    return cjk + (len(text) - cjk) // 4 + 1
+
+
+class TokenBucket:
+    """令牌桶：按固定速率补充，最多积攒 capacity 个令牌。"""
+
+    def __init__(self, rate_per_minute, burst_seconds=10):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount):
+        """返回凑够 amount 个令牌还需等待的秒数（超过容量的请求按容量计算）。"""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount):
+        """扣除令牌，允许为负（表示透支，后续请求相应推迟）。"""
+        self._refill()
+        self.tokens -= amount
+
+
+class RateLimiter:
+    """RPM + TPM 双令牌桶限流器，供 AsyncLLMClient 在每次请求前调用。
+
+    rpm/tpm 为 0 表示不限制对应维度。请求按到达顺序排队放行。
+    """
+
+    def __init__(self, rpm=0, tpm=0, burst_seconds=10):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._requests = TokenBucket(rpm, burst_seconds) if rpm else None
+        self._tokens = TokenBucket(tpm, burst_seconds) if tpm else None
+        self._lock = asyncio.Lock()
+
+    @property
+    def enabled(self):
+        return self._requests is not None or self._tokens is not None
+
+    async def acquire(self, tokens):
+        """等待直到可以发出一个预计消耗 tokens 的请求。"""
+        if not self.enabled:
+            return
+        async with self._lock:
+            while True:
+                wait = 0.0
+                if self._requests:
+                    wait = max(wait, self._requests.wait_time(1))
+                if self._tokens:
+                    wait = max(wait, self._tokens.wait_time(tokens))
+                if wait <= 0:
+                    break
+                await asyncio.sleep(wait)
+
+            if self._requests:
+                self._requests.consume(1)
+            if self._tokens:
+                self._tokens.consume(tokens)
+
+    def record_usage(self, estimated, actual):
+        """用接口返回的实际 token 用量校正预估值。"""
+        if self._tokens and actual:
+            self._tokens.consume(actual - estimated)
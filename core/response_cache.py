@@ -0,0 +1,109 @@
+"""LLM 响应磁盘缓存：相同模型、提示词和参数的请求直接复用上次的返回内容。"""
+
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """基于 SQLite 的 LRU 响应缓存。
+
+    键为 (模型, 系统提示词, 用户提示词, temperature) 的 SHA-256，值为模型输出的原始文本。
+    条目数超过 max_entries 时按最近使用时间淘汰最旧的约 10%。
+    """
+
+    def __init__(self, db_path, max_entries=100000):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                " key TEXT PRIMARY KEY,"
+                " content TEXT NOT NULL,"
+                " last_used REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_cache_last_used ON cache (last_used)"
+            )
+            self._conn.commit()
+            self._count = self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    @staticmethod
+    def make_key(model, system_prompt, user_prompt, temperature):
+        payload = json.dumps([model, system_prompt, user_prompt, temperature],
+                             ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """返回缓存的内容，未命中返回 None。"""
+        return self.get_any([key])
+
+    def get_any(self, keys):
+        """依次查找多个键，返回第一个命中的内容；整体只计一次命中或未命中。"""
+        with self._lock:
+            for key in keys:
+                row = self._conn.execute(
+                    "SELECT content FROM cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    break
+            else:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute(
+                "UPDATE cache SET last_used = ? WHERE key = ?", (time.time(), key)
+            )
+            self._conn.commit()
+            return row[0]
+
+    def put(self, key, content):
+        with self._lock:
+            cur = self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, content, last_used) VALUES (?, ?, ?)",
+                (key, content, time.time()),
+            )
+            if cur.rowcount:
+                self._count += 1
+            if self._count > self.max_entries:
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """淘汰最久未使用的条目，使条目数降到上限的 90%。"""
+        self._count = self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        excess = self._count - int(self.max_entries * 0.9)
+        if excess <= 0:
+            return
+        self._conn.execute(
+            "DELETE FROM cache WHERE key IN"
+            " (SELECT key FROM cache ORDER BY last_used LIMIT ?)",
+            (excess,),
+        )
+        self._count -= excess
+        logger.info(f"响应缓存已淘汰 {excess} 条最久未使用的记录")
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+
+    def stats_message(self):
+        """返回命中统计的日志文本。"""
+        lookups = self.hits + self.misses
+        rate = self.hits / lookups * 100 if lookups else 0
+        return f"响应缓存命中 {self.hits}/{lookups} ({rate:.0f}%)，缓存条目 {self._count}"
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,68 @@
+"""按行号索引的校验结果容器，在结果到达时维护，供界面和导出共用。"""
+
+# 评分分档（与界面颜色、报告底色一致）
+LOW = "low"     # <= 5
+MID = "mid"     # 6-7
+HIGH = "high"   # >= 8
+
+
+def score_bucket(score):
+    """返回评分所属分档，非整数评分返回 None。"""
+    if not isinstance(score, int):
+        return None
+    if score <= 5:
+        return LOW
+    if score <= 7:
+        return MID
+    return HIGH
+
+
+class ResultIndex:
+    """行号 -> 结果 的索引，附带按评分分档的行数统计。
+
+    迭代顺序为加入顺序（校验器按行号顺序记录结果，因此即行号顺序）。
+    同一行重复加入时以最后一次为准。
+    """
+
+    def __init__(self, results=()):
+        self._by_row = {}
+        self._counts = {LOW: 0, MID: 0, HIGH: 0, None: 0}
+        self.extend(results)
+
+    @classmethod
+    def of(cls, results):
+        """results 已经是 ResultIndex 时直接返回，否则建立索引。"""
+        return results if isinstance(results, cls) else cls(results)
+
+    def add(self, item_result):
+        row = item_result["row"]
+        old = self._by_row.get(row)
+        if old is not None:
+            self._counts[score_bucket(old["result"].get("score"))] -= 1
+        self._by_row[row] = item_result
+        self._counts[score_bucket(item_result["result"].get("score"))] += 1
+
+    def extend(self, results):
+        for item_result in results:
+            self.add(item_result)
+
+    def get(self, row):
+        """返回该行的完整结果 {"row", "source", "target", "result"}，没有则返回 None。"""
+        return self._by_row.get(row)
+
+    def result_for(self, row):
+        """返回该行的评分结果 dict，没有则返回 None。"""
+        item_result = self._by_row.get(row)
+        return item_result["result"] if item_result is not None else None
+
+    def bucket_counts(self):
+        return dict(self._counts)
+
+    def __len__(self):
+        return len(self._by_row)
+
+    def __contains__(self, row):
+        return row in self._by_row
+
+    def __iter__(self):
+        return iter(list(self._by_row.values()))
@@ -0,0 +1,190 @@
+"""基于 SQLite 的校验结果存储，保存每次运行及逐行结果，用于断点续传。
+
+运行完成并写出结果文件后，该运行由调用方删除（TranslationChecker.discard_run）。
+"""
+
+import json
+import os
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+class RunStatus:
+    """运行状态枚举。"""
+    RUNNING = "running"
+    STOPPED = "stopped"
+    COMPLETED = "completed"
+    ERROR = "error"
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    excel_path TEXT NOT NULL,
+    prompt_name TEXT,
+    model TEXT,
+    total INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_runs_path_status ON runs (excel_path, status);
+
+CREATE TABLE IF NOT EXISTS results (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    row INTEGER NOT NULL,
+    source TEXT NOT NULL,
+    target TEXT NOT NULL,
+    score INTEGER,
+    result TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    PRIMARY KEY (run_id, row)
+);
+CREATE INDEX IF NOT EXISTS idx_results_run_score ON results (run_id, score);
+"""
+
+
+class ResultStore:
+    """校验结果存储（SQLite，WAL 模式）。
+
+    单个连接在多个线程间共享，所有访问通过锁串行化：
+    校验线程成批写入，读取结果时按行号分批（iter_results）。
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("PRAGMA foreign_keys=ON")
+            self._conn.executescript(_SCHEMA)
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # ── 运行 ──
+
+    def create_run(self, excel_path, prompt_name, model, total):
+        """新建一次运行，返回 run_id。"""
+        now = datetime.now().isoformat()
+        with self._lock:
+            cur = self._conn.execute(
+                "INSERT INTO runs (excel_path, prompt_name, model, total, status,"
+                " created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (os.path.abspath(excel_path), prompt_name, model, total,
+                 RunStatus.RUNNING, now, now),
+            )
+            self._conn.commit()
+            return cur.lastrowid
+
+    def set_run_status(self, run_id, status):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE runs SET status = ?, updated_at = ? WHERE id = ?",
+                (status, datetime.now().isoformat(), run_id),
+            )
+            self._conn.commit()
+
+    def get_run(self, run_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM runs WHERE id = ?", (run_id,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def find_unfinished_run(self, excel_path):
+        """返回该 Excel 文件最近一次未完成的运行，没有则返回 None。"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM runs WHERE excel_path = ? AND status != ?"
+                " ORDER BY id DESC LIMIT 1",
+                (os.path.abspath(excel_path), RunStatus.COMPLETED),
+            ).fetchone()
+        return dict(row) if row else None
+
+    def delete_run(self, run_id):
+        with self._lock:
+            self._conn.execute("DELETE FROM runs WHERE id = ?", (run_id,))
+            self._conn.commit()
+
+    # ── 结果 ──
+
+    def add_results(self, run_id, item_results):
+        """在一个事务中写入多行结果（同一行号重复写入时覆盖）。"""
+        now = datetime.now().isoformat()
+        records = []
+        for item_result in item_results:
+            result = item_result.get("result", {})
+            score = result.get("score")
+            records.append((run_id, item_result["row"], item_result["source"],
+                            item_result["target"], score if isinstance(score, int) else None,
+                            json.dumps(result, ensure_ascii=False), now))
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO results"
+                " (run_id, row, source, target, score, result, created_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                records,
+            )
+            self._conn.commit()
+
+    def completed_rows(self, run_id):
+        """返回已完成的行号集合。"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT row FROM results WHERE run_id = ?", (run_id,)
+            ).fetchall()
+        return {r["row"] for r in rows}
+
+    def count_results(self, run_id):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM results WHERE run_id = ?", (run_id,)
+            ).fetchone()[0]
+
+    def count_by_score(self, run_id):
+        """返回 {评分: 行数}。"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT score, COUNT(*) AS n FROM results WHERE run_id = ?"
+                " GROUP BY score ORDER BY score", (run_id,)
+            ).fetchall()
+        return {r["score"]: r["n"] for r in rows}
+
+    def iter_results(self, run_id, batch_size=1000):
+        """按行号顺序分批读取结果，避免一次性载入全部结果。
+
+        Args:
+            run_id: 运行 ID
+            batch_size: 每批读取的行数
+        """
+        last_row = -1
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT * FROM results WHERE run_id = ? AND row > ?"
+                    " ORDER BY row LIMIT ?", (run_id, last_row, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            for r in rows:
+                yield self._to_item_result(r)
+            last_row = rows[-1]["row"]
+
+    @staticmethod
+    def _to_item_result(r):
+        return {
+            "row": r["row"],
+            "source": r["source"],
+            "target": r["target"],
+            "result": json.loads(r["result"]),
+        }
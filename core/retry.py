@@ -0,0 +1,41 @@
+"""请求重试等待时间：指数退避加随机抖动，服务端给出 Retry-After 时以其为准。"""
+
+import random
+
+BASE_DELAY = 1.0   # 第一次重试的基准等待（秒）
+MAX_DELAY = 60.0   # 单次等待上限（秒）
+
+
+def retry_delay(attempt, retry_after=None, base=BASE_DELAY, cap=MAX_DELAY):
+    """返回第 attempt 次尝试失败后、下一次尝试前的等待秒数。
+
+    指数退避取一半固定、一半随机，避免大量并发请求在同一时刻重试；
+    Retry-After 只附加少量抖动。
+    """
+    if retry_after is not None:
+        delay = min(cap, max(0.0, retry_after))
+        return delay + random.uniform(0, min(1.0, delay * 0.1))
+    delay = min(cap, base * 2 ** (attempt - 1))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def parse_retry_after(headers):
+    """从响应头读取 Retry-After（秒），支持 retry-after-ms；无法解析时返回 None。
+
+    HTTP 日期格式的 Retry-After 在 LLM 服务中很少见，视为没有。
+    """
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value is not None:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if value is not None:
+        try:
+            return float(value)
+        except ValueError:
+            pass
+    return None
@@ -1,18 +1,36 @@
 """主窗口界面。"""
 
 import os
+import queue
+import logging
+import itertools
 import tkinter as tk
-from tkinter import ttk, filedialog, messagebox
+from tkinter import filedialog, messagebox
 from datetime import datetime
 import threading
 
 import customtkinter as ctk
 
 from core.checker import TranslationChecker, CheckerState
-from core.excel_handler import read_excel, write_results_to_excel, write_independent_report
 from core.prompts import get_prompt_names, BUILTIN_PROMPTS
+from core.result_index import LOW
 from gui.settings_dialog import SettingsDialog
 from gui.result_viewer import ResultViewerDialog
+from gui.result_table import VirtualResultTable
+from gui.log_viewer import LogViewerDialog
+
+# 界面刷新间隔（毫秒）：子线程的回调事件先入队，按此频率批量处理，
+# 界面开销与校验速度无关
+UPDATE_INTERVAL_MS = 66
+
+# 日志面板最多保留的行数，更早的内容可在「完整日志」中查看
+LOG_PANEL_MAX_LINES = 1000
+
+
+def _warm_up():
+    """后台预加载校验时才用到的模块（openai SDK、openpyxl），窗口显示后执行。"""
+    import core.api_client
+    import core.excel_handler
 
 
 class MainApp(ctk.CTk):
@@ -34,18 +52,29 @@ class MainApp(ctk.CTk):
 
         # 校验器
         checkpoint_dir = os.path.join(base_dir, "checkpoints")
-        self.checker = TranslationChecker(checkpoint_dir)
+        self.checker = TranslationChecker(
+            checkpoint_dir, cache_max_entries=config.get("cache_max_entries", 100000),
+        )
         self.checker.on_progress = self._on_progress
         self.checker.on_complete = self._on_complete
         self.checker.on_error = self._on_error
         self.checker.on_state_change = self._on_state_change
         self.checker.on_log = self._on_log
 
-        # 数据
-        self.excel_data = []
-        self.all_results = []  # 用于结果展示和导出
+        # 数据：Excel 行在校验时流式读取，结果在 self.checker.results 中按行号查询
+        self.export_path = None  # 当前运行的增量导出 CSV
+        self._export_thread = None  # 写出最终结果文件的后台线程
+
+        # 子线程回调事件队列，由 _pump_events 在主线程定时处理
+        self._events = queue.SimpleQueue()
 
         self._build_ui()
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
+        self.after(UPDATE_INTERVAL_MS, self._pump_events)
+
+        # 重量级依赖不在启动时导入：窗口绘制完成后在后台线程预加载，
+        # 用户点击开始前通常已加载完毕
+        self.after_idle(lambda: threading.Thread(target=_warm_up, daemon=True).start())
 
     def _build_ui(self):
         # ── 顶部标题栏 ──
@@ -145,50 +174,33 @@ class MainApp(ctk.CTk):
             font=("", 13, "bold"), anchor="w",
         ).pack(fill="x", padx=10, pady=(5, 2))
 
-        # 使用 tkinter Treeview（CustomTkinter 没有原生表格）
-        tree_container = ctk.CTkFrame(table_frame)
-        tree_container.pack(fill="both", expand=True, padx=10, pady=(0, 10))
-
-        columns = ("row", "source", "target", "score", "summary")
-        self.tree = ttk.Treeview(
-            tree_container, columns=columns, show="headings", height=12,
+        # 虚拟化表格：只绘制可见行，数据按需从结果索引读取
+        self.result_table = VirtualResultTable(
+            table_frame,
+            lookup=lambda row: self.checker.results.get(row),
         )
-        self.tree.heading("row", text="行号")
-        self.tree.heading("source", text="中文原文")
-        self.tree.heading("target", text="英文译文")
-        self.tree.heading("score", text="评分")
-        self.tree.heading("summary", text="问题摘要")
-
-        self.tree.column("row", width=50, minwidth=40, anchor="center")
-        self.tree.column("source", width=250, minwidth=100)
-        self.tree.column("target", width=250, minwidth=100)
-        self.tree.column("score", width=50, minwidth=40, anchor="center")
-        self.tree.column("summary", width=250, minwidth=100)
-
-        scrollbar = ttk.Scrollbar(tree_container, orient="vertical", command=self.tree.yview)
-        self.tree.configure(yscrollcommand=scrollbar.set)
-
-        self.tree.pack(side="left", fill="both", expand=True)
-        scrollbar.pack(side="right", fill="y")
-
-        self.tree.bind("<Double-1>", self._on_tree_double_click)
-
-        # 配置 Treeview 的标签样式
-        self.tree.tag_configure("low_score", foreground="red")
-        self.tree.tag_configure("mid_score", foreground="orange")
-        self.tree.tag_configure("high_score", foreground="green")
+        self.result_table.pack(fill="both", expand=True, padx=10, pady=(0, 10))
+        self.result_table.tree.bind("<Double-1>", self._on_tree_double_click)
 
         # ── 日志区域 ──
         log_frame = ctk.CTkFrame(self)
         log_frame.pack(fill="x", padx=15, pady=(0, 10))
 
+        log_header = ctk.CTkFrame(log_frame, fg_color="transparent")
+        log_header.pack(fill="x", padx=10, pady=(5, 2))
         ctk.CTkLabel(
-            log_frame, text="日志", font=("", 12, "bold"), anchor="w",
-        ).pack(fill="x", padx=10, pady=(5, 2))
+            log_header, text="日志", font=("", 12, "bold"), anchor="w",
+        ).pack(side="left")
+        ctk.CTkButton(
+            log_header, text="完整日志", width=80, height=24,
+            command=self._open_full_log,
+        ).pack(side="right")
 
+        # 面板只保留最近 LOG_PANEL_MAX_LINES 行（环形缓冲），超出部分从顶部删除
         self.log_textbox = ctk.CTkTextbox(log_frame, height=100, wrap="word")
         self.log_textbox.pack(fill="x", padx=10, pady=(0, 10))
         self.log_textbox.configure(state="disabled")
+        self._log_line_count = 0
 
     # ── 提示词列表 ──
 
@@ -252,23 +264,27 @@ class MainApp(ctk.CTk):
             output_dir = os.path.dirname(excel_path)
             self.output_dir_var.set(output_dir)
 
-        # 读取 Excel
+        from core.excel_handler import iter_excel, count_excel_rows
+
+        # 打开 Excel（流式读取，先取第一行确认有数据）
         try:
-            self.excel_data = read_excel(excel_path)
-            if not self.excel_data:
+            rows = iter_excel(excel_path)
+            first = next(rows, None)
+            if first is None:
                 messagebox.showerror("错误", "Excel 文件中没有找到有效数据")
                 return
-            self._log_message(f"读取到 {len(self.excel_data)} 行数据")
+            total = count_excel_rows(excel_path)
+            self._log_message(f"约 {total} 行数据，边读取边校验")
         except Exception as e:
             messagebox.showerror("错误", f"读取 Excel 失败: {e}")
             return
+        data = itertools.chain([first], rows)
 
         # 检查断点
         resume = False
         cp = self.checker.load_checkpoint(excel_path)
         if cp:
             completed = len(cp.get("completed_rows", []))
-            total = len(self.excel_data)
             answer = messagebox.askyesnocancel(
                 "检测到断点",
                 f"检测到未完成的任务 ({completed}/{total})。\n\n"
@@ -295,18 +311,26 @@ class MainApp(ctk.CTk):
             "base_url": self.config["base_url"],
             "api_key": self.config["api_key"],
             "model": self.config["model"],
+            "rpm": self.config.get("rpm", 0),
+            "tpm": self.config.get("tpm", 0),
+            "use_cache": self.config.get("use_cache", True),
+            "hedge_percentile": self.config.get("hedge_percentile", 0),
+            "hedge_base_url": self.config.get("hedge_base_url", ""),
+            "hedge_api_key": self.config.get("hedge_api_key", ""),
+            "hedge_model": self.config.get("hedge_model", ""),
+            "provider": self.config.get("provider"),
+            "extra_providers": self.config.get("extra_providers", []),
         }
 
-        # 清空表格（如果不是续传）
-        if not resume:
-            self.tree.delete(*self.tree.get_children())
-            self.all_results = []
+        # 清空表格，续传时从结果库恢复已有结果
+        if resume and cp:
+            self.result_table.load_rows(sorted(cp["completed_rows"]))
         else:
-            # 恢复已有结果到表格
-            if cp and cp.get("results"):
-                self.all_results = cp["results"]
-                for r in self.all_results:
-                    self._insert_tree_row(r)
+            self.result_table.clear()
+
+        # 已完成的结果实时追加到 CSV，中途停止或崩溃时也能直接查看
+        base_name = os.path.splitext(os.path.basename(excel_path))[0]
+        self.export_path = os.path.join(output_dir, f"{base_name}_progress.csv")
 
         # 更新按钮状态
         self.start_btn.configure(state="disabled")
@@ -314,8 +338,13 @@ class MainApp(ctk.CTk):
         self.stop_btn.configure(state="normal")
 
         self.checker.start(
-            self.excel_data, excel_path, prompt_name,
+            data, excel_path, prompt_name,
             custom_prompt, api_config, resume=resume,
+            concurrency=self.config.get("concurrency", 1),
+            adaptive=self.config.get("adaptive_concurrency", False),
+            batch_size=self.config.get("batch_size", 1),
+            total=total,
+            export_path=self.export_path,
         )
 
     def _toggle_pause(self):
@@ -329,86 +358,133 @@ class MainApp(ctk.CTk):
     def _stop_check(self):
         self.checker.stop()
 
-    # ── 回调（从子线程调用，需要 after 调度到主线程） ──
+    # ── 回调（从子线程调用，只入队，由主线程定时批量处理） ──
 
     def _on_progress(self, current, total, item_result):
-        self.after(0, self._update_progress, current, total, item_result)
+        self._events.put(("progress", (current, total, item_result)))
 
     def _on_complete(self, results):
-        self.after(0, self._handle_complete, results)
+        self._events.put(("complete", results))
 
     def _on_error(self, error_msg):
-        self.after(0, lambda: messagebox.showerror("校验错误", error_msg))
-        self.after(0, self._reset_buttons)
+        self._events.put(("error", error_msg))
 
     def _on_state_change(self, new_state):
-        self.after(0, self._handle_state_change, new_state)
+        self._events.put(("state", new_state))
 
     def _on_log(self, message):
-        self.after(0, self._log_message, message)
+        self._events.put(("log", message))
 
-    def _update_progress(self, current, total, item_result):
-        progress = current / total if total > 0 else 0
+    def _pump_events(self):
+        """取出队列中积压的全部事件：进度只刷新一次，日志一次性写入。
+
+        处理事件时出错也会照常安排下一次，不会让界面停止更新。
+        """
+        try:
+            progress = None
+            logs = []
+            others = []
+            try:
+                while True:
+                    kind, payload = self._events.get_nowait()
+                    if kind == "progress":
+                        progress = payload
+                        self.result_table.append(payload[2])
+                    elif kind == "log":
+                        logs.append(payload)
+                    else:
+                        others.append((kind, payload))
+            except queue.Empty:
+                pass
+
+            if progress:
+                self._update_progress(progress[0], progress[1])
+            if logs:
+                self._log_messages(logs)
+            # 完成/出错/状态变化在进度和日志之后按原顺序处理
+            for kind, payload in others:
+                if kind == "complete":
+                    self._handle_complete(payload)
+                elif kind == "exported":
+                    self._handle_exported(*payload)
+                elif kind == "error":
+                    self._reset_buttons()
+                    messagebox.showerror("校验错误", payload)
+                elif kind == "state":
+                    self._handle_state_change(payload)
+        finally:
+            self.after(UPDATE_INTERVAL_MS, self._pump_events)
+
+    def _update_progress(self, current, total):
+        progress = min(1.0, current / total) if total > 0 else 0
         self.progress_bar.set(progress)
-        self.status_label.configure(text=f"已完成 {current}/{total} ({progress*100:.0f}%)")
-
-        # 添加到结果列表和表格
-        self.all_results.append(item_result)
-        self._insert_tree_row(item_result)
-
-    def _insert_tree_row(self, item_result):
-        result = item_result.get("result", {})
-        score = result.get("score", "")
-        summary = result.get("summary", "")
-        source = item_result.get("source", "")[:50]
-        target = item_result.get("target", "")[:50]
-
-        tag = "high_score"
-        if isinstance(score, int):
-            if score <= 5:
-                tag = "low_score"
-            elif score <= 7:
-                tag = "mid_score"
-
-        self.tree.insert(
-            "", "end",
-            values=(item_result["row"], source, target, score, summary),
-            tags=(tag,),
+        self.status_label.configure(
+            text=f"已完成 {current}/{total} ({progress*100:.0f}%)  "
+                 f"并发 {self.checker.concurrency_window}"
         )
-        # 自动滚动到底部
-        children = self.tree.get_children()
-        if children:
-            self.tree.see(children[-1])
 
     def _handle_complete(self, results):
-        self._reset_buttons()
+        # 写出结果文件期间不允许开始新的校验
+        self.pause_btn.configure(state="disabled", text="暂停")
+        self.stop_btn.configure(state="disabled")
         self.progress_bar.set(1.0)
-        self.status_label.configure(text="校验完成!")
+        self.status_label.configure(text="校验完成，正在写出结果文件...")
 
         # 生成输出文件
         excel_path = self.file_path_var.get()
         output_dir = self.output_dir_var.get()
         base_name = os.path.splitext(os.path.basename(excel_path))[0]
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-
         checked_path = os.path.join(output_dir, f"{base_name}_checked_{timestamp}.xlsx")
         report_path = os.path.join(output_dir, f"{base_name}_report_{timestamp}.xlsx")
 
+        # 大文件写出较慢，在后台线程进行，界面保持响应
+        self._export_thread = threading.Thread(
+            target=self._export_results,
+            args=(results, self.checker.run_id, excel_path, checked_path, report_path),
+        )
+        self._export_thread.start()
+
+    def _export_results(self, results, run_id, excel_path, checked_path, report_path):
+        """后台线程：写出结果 Excel 和独立报告，完成后通过事件队列通知界面线程。"""
+        from core.excel_handler import write_results_to_excel, write_report_rows
+
+        written = True
         try:
             write_results_to_excel(excel_path, results, checked_path)
-            self._log_message(f"结果已写入: {checked_path}")
+            self._on_log(f"结果已写入: {checked_path}")
         except Exception as e:
-            self._log_message(f"写入结果Excel失败: {e}")
+            written = False
+            self._on_log(f"写入结果Excel失败: {e}")
 
         try:
-            write_independent_report(self.excel_data, results, report_path)
-            self._log_message(f"独立报告已生成: {report_path}")
+            # 结果索引按行号顺序保存了全部结果（含原文/译文），无需重读原 Excel
+            write_report_rows(results, report_path)
+            self._on_log(f"独立报告已生成: {report_path}")
         except Exception as e:
-            self._log_message(f"生成报告失败: {e}")
+            written = False
+            self._on_log(f"生成报告失败: {e}")
 
+        # 结果文件都已写出，结果库中的逐行结果不再需要
+        if written:
+            self.checker.discard_run(run_id)
+        self._events.put(("exported", (results, checked_path, report_path)))
+
+    def _on_close(self):
+        """关闭窗口：停止校验并等待结果文件写完，再关闭结果库和响应缓存。"""
+        self.checker.stop()
+        if self._export_thread:
+            self._export_thread.join()
+        self.checker.close()
+        self.destroy()
+
+    def _handle_exported(self, results, checked_path, report_path):
+        self._reset_buttons()
+        self.status_label.configure(text="校验完成!")
         messagebox.showinfo(
             "校验完成",
-            f"校验完成，共处理 {len(results)} 行。\n\n"
+            f"校验完成，共处理 {len(results)} 行，"
+            f"其中低分 (≤5) {results.bucket_counts()[LOW]} 行。\n\n"
             f"结果文件:\n{checked_path}\n\n"
             f"独立报告:\n{report_path}",
         )
@@ -416,6 +492,8 @@ class MainApp(ctk.CTk):
     def _handle_state_change(self, new_state):
         if new_state in (CheckerState.IDLE, CheckerState.ERROR):
             self._reset_buttons()
+            if self.export_path and os.path.exists(self.export_path):
+                self._log_message(f"已完成的结果已保存: {self.export_path}")
 
     def _reset_buttons(self):
         self.start_btn.configure(state="normal")
@@ -425,23 +503,44 @@ class MainApp(ctk.CTk):
     # ── 结果详情 ──
 
     def _on_tree_double_click(self, event):
-        selected = self.tree.selection()
-        if not selected:
+        row_num = self.result_table.selected_row()
+        if row_num is None:
             return
-        item = self.tree.item(selected[0])
-        row_num = int(item["values"][0])  # Treeview 返回字符串，转为 int
 
-        # 查找对应结果
-        for r in self.all_results:
-            if r["row"] == row_num:
-                ResultViewerDialog(self, r)
-                return
+        r = self.checker.results.get(row_num)
+        if r:
+            ResultViewerDialog(self, r)
 
     # ── 日志 ──
 
     def _log_message(self, message):
+        self._log_messages([message])
+
+    def _log_messages(self, messages):
+        """一次性追加多条日志，只切换一次文本框状态、滚动一次。"""
         timestamp = datetime.now().strftime("%H:%M:%S")
+        text = "".join(f"[{timestamp}] {message}\n" for message in messages)
         self.log_textbox.configure(state="normal")
-        self.log_textbox.insert("end", f"[{timestamp}] {message}\n")
+        self.log_textbox.insert("end", text)
+        self._log_line_count += text.count("\n")
+        # 超出上限 10% 时一次删掉多余的行，避免每条日志都触发删除
+        if self._log_line_count > LOG_PANEL_MAX_LINES * 1.1:
+            excess = self._log_line_count - LOG_PANEL_MAX_LINES
+            self.log_textbox.delete("1.0", f"{excess + 1}.0")
+            self._log_line_count = LOG_PANEL_MAX_LINES
         self.log_textbox.see("end")
         self.log_textbox.configure(state="disabled")
+
+    def _open_full_log(self):
+        # 日志文件由 main.py 配置的 FileHandler 写入
+        log_path = next(
+            (h.baseFilename for h in logging.getLogger().handlers
+             if isinstance(h, logging.FileHandler)),
+            os.path.join(self.base_dir, "translation_checker.log"),
+        )
+        if not os.path.exists(log_path):
+            messagebox.showinfo("完整日志", f"日志文件不存在: {log_path}")
+            return
+        for handler in logging.getLogger().handlers:
+            handler.flush()
+        LogViewerDialog(self, log_path)
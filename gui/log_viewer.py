@@ -0,0 +1,80 @@
+"""完整日志查看窗口：按需读取日志文件末尾内容。"""
+
+import os
+import sys
+import subprocess
+
+import customtkinter as ctk
+
+# 只读取日志文件末尾的这么多字节，避免超大日志卡住界面
+TAIL_BYTES = 2 * 1024 * 1024
+
+
+def read_log_tail(path, max_bytes=TAIL_BYTES):
+    """读取日志文件末尾最多 max_bytes 字节。
+
+    Returns:
+        tuple: (文本, 是否截断)
+    """
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        if size > max_bytes:
+            f.seek(size - max_bytes)
+            f.readline()  # 丢弃被截断的半行
+        data = f.read()
+    return data.decode("utf-8", errors="replace"), size > max_bytes
+
+
+class LogViewerDialog(ctk.CTkToplevel):
+    """显示 translation_checker.log 的内容。"""
+
+    def __init__(self, parent, log_path):
+        super().__init__(parent)
+        self.log_path = log_path
+
+        self.title("完整日志")
+        self.geometry("900x600")
+        self.resizable(True, True)
+
+        toolbar = ctk.CTkFrame(self, fg_color="transparent")
+        toolbar.pack(fill="x", padx=15, pady=(15, 5))
+
+        self.info_label = ctk.CTkLabel(toolbar, text="", anchor="w")
+        self.info_label.pack(side="left", fill="x", expand=True)
+
+        ctk.CTkButton(
+            toolbar, text="用系统程序打开", width=120, command=self._open_external,
+        ).pack(side="right", padx=(5, 0))
+        ctk.CTkButton(
+            toolbar, text="刷新", width=70, command=self._load,
+        ).pack(side="right")
+
+        self.textbox = ctk.CTkTextbox(self, wrap="none", font=("Consolas", 12))
+        self.textbox.pack(fill="both", expand=True, padx=15, pady=(0, 15))
+
+        self._load()
+
+    def _load(self):
+        self.textbox.configure(state="normal")
+        self.textbox.delete("1.0", "end")
+        try:
+            text, truncated = read_log_tail(self.log_path)
+        except OSError as e:
+            self.info_label.configure(text=f"读取日志失败: {e}")
+        else:
+            self.textbox.insert("1.0", text)
+            self.textbox.see("end")
+            note = f"（仅显示最后 {TAIL_BYTES // 1024 // 1024} MB）" if truncated else ""
+            self.info_label.configure(text=f"{self.log_path}{note}")
+        self.textbox.configure(state="disabled")
+
+    def _open_external(self):
+        try:
+            if sys.platform == "win32":
+                os.startfile(self.log_path)
+            elif sys.platform == "darwin":
+                subprocess.Popen(["open", self.log_path])
+            else:
+                subprocess.Popen(["xdg-open", self.log_path])
+        except OSError as e:
+            self.info_label.configure(text=f"无法打开日志文件: {e}")
@@ -0,0 +1,239 @@
+"""虚拟化结果表格：只为可见的几十行创建表格项，数据按需从结果索引读取。"""
+
+from tkinter import ttk
+from array import array
+from collections import deque
+
+import customtkinter as ctk
+
+from core.result_index import score_bucket, LOW, MID
+
+# 最近追加的行缓存格式化后的显示内容，跟随到底部时直接使用
+TAIL_CACHE = 500
+
+
+class VirtualResultTable(ctk.CTkFrame):
+    """结果预览表格。
+
+    Treeview 中只保留与可见行数相同的固定数量表格项，滚动时替换其内容；
+    表格本身只保存行号列表，追加和滚动到底部均为常数时间，与结果总数无关。
+
+    Args:
+        lookup: 行号 -> 结果的函数，如 ResultIndex.get
+    """
+
+    def __init__(self, master, lookup=None, **kwargs):
+        super().__init__(master, **kwargs)
+        self.lookup = lookup
+
+        self._rows = array("q")   # 按显示顺序排列的行号
+        self._tail = deque(maxlen=TAIL_CACHE)  # 末尾若干行的 (行号, values, tag)
+        self._top = 0             # 第一个可见行在 _rows 中的位置
+        self._visible = 12
+        self._follow = True       # 是否自动跟随到最后一行
+        self._selected_row = None
+        self._refresh_pending = False
+        self._row_height = 20
+        self._header_height = 25
+
+        columns = ("row", "source", "target", "score", "summary")
+        # 使用 tkinter Treeview（CustomTkinter 没有原生表格）
+        self.tree = ttk.Treeview(
+            self, columns=columns, show="headings", height=12, selectmode="browse",
+        )
+        self.tree.heading("row", text="行号")
+        self.tree.heading("source", text="中文原文")
+        self.tree.heading("target", text="英文译文")
+        self.tree.heading("score", text="评分")
+        self.tree.heading("summary", text="问题摘要")
+
+        self.tree.column("row", width=50, minwidth=40, anchor="center")
+        self.tree.column("source", width=250, minwidth=100)
+        self.tree.column("target", width=250, minwidth=100)
+        self.tree.column("score", width=50, minwidth=40, anchor="center")
+        self.tree.column("summary", width=250, minwidth=100)
+
+        # 配置 Treeview 的标签样式
+        self.tree.tag_configure("low_score", foreground="red")
+        self.tree.tag_configure("mid_score", foreground="orange")
+        self.tree.tag_configure("high_score", foreground="green")
+
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self._on_scrollbar)
+        self.tree.pack(side="left", fill="both", expand=True)
+        self.scrollbar.pack(side="right", fill="y")
+
+        self._slots = []
+        self._resize_slots(self._visible)
+
+        self.tree.bind("<Configure>", self._on_configure)
+        self.tree.bind("<<TreeviewSelect>>", self._on_select)
+        self.tree.bind("<MouseWheel>", self._on_mousewheel)
+        self.tree.bind("<Button-4>", lambda e: self._scroll_by(-3))
+        self.tree.bind("<Button-5>", lambda e: self._scroll_by(3))
+        for key in ("<Up>", "<Down>", "<Prior>", "<Next>", "<Home>", "<End>"):
+            self.tree.bind(key, self._on_key)
+
+    # ── 数据 ──
+
+    def __len__(self):
+        return len(self._rows)
+
+    def clear(self):
+        self._rows = array("q")
+        self._tail.clear()
+        self._top = 0
+        self._follow = True
+        self._selected_row = None
+        self._schedule_refresh()
+
+    def load_rows(self, rows):
+        """用已有结果的行号（按顺序）初始化表格，续传时使用。"""
+        self.clear()
+        self._rows.extend(rows)
+        self._scroll_to(len(self._rows))
+
+    def append(self, item_result):
+        """追加一行结果。"""
+        self._rows.append(item_result["row"])
+        self._tail.append(self._format(item_result))
+        if self._follow:
+            self._top = max(0, len(self._rows) - self._visible)
+        self._schedule_refresh()
+
+    def selected_row(self):
+        """返回当前选中行的行号，未选中返回 None。"""
+        return self._selected_row
+
+    @staticmethod
+    def _format(item_result):
+        result = item_result.get("result", {})
+        score = result.get("score", "")
+        summary = result.get("summary", "")
+        source = item_result.get("source", "")[:50]
+        target = item_result.get("target", "")[:50]
+
+        tag = {LOW: "low_score", MID: "mid_score"}.get(score_bucket(score), "high_score")
+        return item_result["row"], (item_result["row"], source, target, score, summary), tag
+
+    def _visible_entries(self):
+        """返回当前可见行的 (行号, values, tag) 列表。"""
+        rows = self._rows[self._top:self._top + self._visible]
+        if not rows:
+            return []
+
+        tail_start = len(self._rows) - len(self._tail)
+        if self._top >= tail_start:
+            offset = self._top - tail_start
+            return [self._tail[offset + i] for i in range(len(rows))]
+
+        if self.lookup is None:
+            return []
+        item_results = (self.lookup(row) for row in rows)
+        return [self._format(r) for r in item_results if r is not None]
+
+    # ── 绘制 ──
+
+    def _resize_slots(self, count):
+        while len(self._slots) < count:
+            self._slots.append(self.tree.insert("", "end", values=()))
+        while len(self._slots) > count:
+            self.tree.delete(self._slots.pop())
+
+    def _schedule_refresh(self):
+        # 同一轮事件循环中的多次追加只重绘一次
+        if not self._refresh_pending:
+            self._refresh_pending = True
+            self.after_idle(self._refresh)
+
+    def _refresh(self):
+        self._refresh_pending = False
+        entries = self._visible_entries()
+        selected_slot = None
+        for i, slot in enumerate(self._slots):
+            if i < len(entries):
+                row, values, tag = entries[i]
+                self.tree.item(slot, values=values, tags=(tag,))
+                if row == self._selected_row:
+                    selected_slot = slot
+            else:
+                self.tree.item(slot, values=(), tags=())
+
+        if selected_slot:
+            self.tree.selection_set(selected_slot)
+        elif self.tree.selection():
+            self.tree.selection_remove(self.tree.selection())
+
+        count = len(self._rows)
+        if count:
+            self.scrollbar.set(self._top / count, min(1.0, (self._top + self._visible) / count))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    # ── 滚动 ──
+
+    def _scroll_to(self, top):
+        max_top = max(0, len(self._rows) - self._visible)
+        self._top = min(max(0, int(top)), max_top)
+        self._follow = self._top >= max_top
+        self._schedule_refresh()
+
+    def _scroll_by(self, delta):
+        self._scroll_to(self._top + delta)
+        return "break"
+
+    def _on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self._scroll_to(float(amount) * len(self._rows))
+        elif action == "scroll":
+            step = self._visible if unit == "pages" else 1
+            self._scroll_by(int(amount) * step)
+
+    def _on_mousewheel(self, event):
+        # Windows 每格 120，macOS 为较小的整数
+        steps = event.delta // 120 if abs(event.delta) >= 120 else event.delta
+        return self._scroll_by(-3 * steps)
+
+    def _on_key(self, event):
+        slot_index = (self._slots.index(self.tree.selection()[0])
+                      if self.tree.selection() else None)
+        if event.keysym == "Up" and slot_index == 0:
+            # 已在第一行时向上滚动一行，选中项随之移动
+            if self._top > 0:
+                self._selected_row = self._rows[self._top - 1]
+            self._scroll_by(-1)
+        elif event.keysym == "Down" and slot_index == self._visible - 1:
+            if self._top + self._visible < len(self._rows):
+                self._selected_row = self._rows[self._top + self._visible]
+            self._scroll_by(1)
+        elif event.keysym == "Prior":
+            self._scroll_by(-self._visible)
+        elif event.keysym == "Next":
+            self._scroll_by(self._visible)
+        elif event.keysym == "Home":
+            self._scroll_to(0)
+        elif event.keysym == "End":
+            self._scroll_to(len(self._rows))
+        else:
+            return None  # 可见范围内的上下移动交给 Treeview 处理
+        return "break"
+
+    def _on_select(self, event):
+        selection = self.tree.selection()
+        if not selection:
+            return
+        values = self.tree.item(selection[0], "values")
+        if values:
+            self._selected_row = int(values[0])  # Treeview 返回字符串，转为 int
+
+    def _on_configure(self, event):
+        # 用第一个表格项的实际位置测量表头和行高
+        bbox = self.tree.bbox(self._slots[0]) if self._slots else None
+        if bbox:
+            self._header_height, self._row_height = bbox[1], bbox[3]
+        visible = max(1, (event.height - self._header_height) // self._row_height)
+        if visible != self._visible:
+            self._visible = visible
+            self._resize_slots(visible)
+            if self._follow:
+                self._top = max(0, len(self._rows) - visible)
+            self._scroll_to(self._top)
@@ -2,6 +2,8 @@
 
 import customtkinter as ctk
 
+from core.result_index import score_bucket, LOW, HIGH
+
 
 class ResultViewerDialog(ctk.CTkToplevel):
     """双击表格行时弹出的详细结果查看窗口。"""
@@ -73,10 +75,11 @@ class ResultViewerDialog(ctk.CTkToplevel):
         textbox.configure(state="disabled")
 
     def _score_color(self, score):
-        if not isinstance(score, (int, float)):
+        bucket = score_bucket(score)
+        if bucket is None:
             return "gray"
-        if score >= 8:
+        if bucket == HIGH:
             return "#2ecc71"
-        if score >= 6:
-            return "#f39c12"
-        return "#e74c3c"
+        if bucket == LOW:
+            return "#e74c3c"
+        return "#f39c12"
@@ -3,7 +3,7 @@
 import json
 import threading
 import customtkinter as ctk
-from core.api_client import PRESET_PROVIDERS, LLMClient
+from core.providers import PRESET_PROVIDERS
 from core.prompts import BUILTIN_PROMPTS
 
 
@@ -14,7 +14,7 @@ class SettingsDialog(ctk.CTkToplevel):
         super().__init__(parent)
 
         self.title("设置")
-        self.geometry("650x580")
+        self.geometry("650x620")
         self.resizable(False, False)
         self.grab_set()
 
@@ -75,12 +75,57 @@ class SettingsDialog(ctk.CTkToplevel):
             row=3, column=1, sticky="ew", pady=5, padx=5
         )
 
+        # 并发数
+        ctk.CTkLabel(tab, text="并发数:").grid(row=4, column=0, sticky="w", pady=5, padx=5)
+        self.concurrency_var = ctk.StringVar(value=str(self.config.get("concurrency", 4)))
+        ctk.CTkEntry(tab, textvariable=self.concurrency_var, width=80).grid(
+            row=4, column=1, sticky="w", pady=5, padx=5
+        )
+        self.adaptive_var = ctk.BooleanVar(value=self.config.get("adaptive_concurrency", False))
+        ctk.CTkCheckBox(
+            tab, text="自适应（并发数作为上限）", variable=self.adaptive_var,
+        ).grid(row=4, column=1, sticky="w", pady=5, padx=(100, 5))
+
+        # 限流额度（0 表示不限）
+        ctk.CTkLabel(tab, text="RPM 限额:").grid(row=5, column=0, sticky="w", pady=5, padx=5)
+        self.rpm_var = ctk.StringVar(value=str(self.config.get("rpm", 0)))
+        ctk.CTkEntry(tab, textvariable=self.rpm_var, width=80).grid(
+            row=5, column=1, sticky="w", pady=5, padx=5
+        )
+
+        ctk.CTkLabel(tab, text="TPM 限额:").grid(row=6, column=0, sticky="w", pady=5, padx=5)
+        self.tpm_var = ctk.StringVar(value=str(self.config.get("tpm", 0)))
+        ctk.CTkEntry(tab, textvariable=self.tpm_var, width=120).grid(
+            row=6, column=1, sticky="w", pady=5, padx=5
+        )
+
+        # 每次请求打包的行数
+        ctk.CTkLabel(tab, text="每次请求行数:").grid(row=7, column=0, sticky="w", pady=5, padx=5)
+        self.batch_size_var = ctk.StringVar(value=str(self.config.get("batch_size", 1)))
+        ctk.CTkEntry(tab, textvariable=self.batch_size_var, width=80).grid(
+            row=7, column=1, sticky="w", pady=5, padx=5
+        )
+        self.use_cache_var = ctk.BooleanVar(value=self.config.get("use_cache", True))
+        ctk.CTkCheckBox(
+            tab, text="复用缓存的校验结果", variable=self.use_cache_var,
+        ).grid(row=7, column=1, sticky="w", pady=5, padx=(100, 5))
+
+        # 对冲请求（备用服务商只能在 config.json 中配置）
+        ctk.CTkLabel(tab, text="对冲分位(%):").grid(row=8, column=0, sticky="w", pady=5, padx=5)
+        self.hedge_var = ctk.StringVar(value=str(self.config.get("hedge_percentile", 0)))
+        ctk.CTkEntry(tab, textvariable=self.hedge_var, width=80).grid(
+            row=8, column=1, sticky="w", pady=5, padx=5
+        )
+        ctk.CTkLabel(
+            tab, text="请求超过该延迟分位仍未返回时重发，如 95；0 表示关闭", text_color="gray",
+        ).grid(row=8, column=1, sticky="w", pady=5, padx=(100, 5))
+
         # 测试连接按钮
         self.test_btn = ctk.CTkButton(tab, text="测试连接", command=self._test_connection)
-        self.test_btn.grid(row=4, column=1, sticky="w", pady=10, padx=5)
+        self.test_btn.grid(row=9, column=1, sticky="w", pady=10, padx=5)
 
         self.test_label = ctk.CTkLabel(tab, text="", text_color="gray")
-        self.test_label.grid(row=5, column=0, columnspan=2, sticky="w", padx=5)
+        self.test_label.grid(row=10, column=0, columnspan=2, sticky="w", padx=5)
 
         tab.grid_columnconfigure(1, weight=1)
 
@@ -90,6 +135,9 @@ class SettingsDialog(ctk.CTkToplevel):
             self.base_url_var.set(preset["base_url"])
         if preset.get("default_model"):
             self.model_var.set(preset["default_model"])
+        if "rpm" in preset:
+            self.rpm_var.set(str(preset["rpm"]))
+            self.tpm_var.set(str(preset["tpm"]))
 
     def _test_connection(self):
         self.test_label.configure(text="正在测试...", text_color="gray")
@@ -97,6 +145,7 @@ class SettingsDialog(ctk.CTkToplevel):
 
         def _do_test():
             try:
+                from core.api_client import LLMClient  # openai SDK 较重，用到时再加载
                 client = LLMClient(
                     base_url=self.base_url_var.get(),
                     api_key=self.api_key_var.get(),
@@ -259,6 +308,25 @@ class SettingsDialog(ctk.CTkToplevel):
         self.config["base_url"] = self.base_url_var.get()
         self.config["api_key"] = self.api_key_var.get()
         self.config["model"] = self.model_var.get()
+        try:
+            self.config["concurrency"] = max(1, int(self.concurrency_var.get()))
+        except ValueError:
+            self.config["concurrency"] = 1
+        self.config["adaptive_concurrency"] = self.adaptive_var.get()
+        self.config["use_cache"] = self.use_cache_var.get()
+        try:
+            self.config["batch_size"] = max(1, int(self.batch_size_var.get()))
+        except ValueError:
+            self.config["batch_size"] = 1
+        for key, var in (("rpm", self.rpm_var), ("tpm", self.tpm_var)):
+            try:
+                self.config[key] = max(0, int(var.get()))
+            except ValueError:
+                self.config[key] = 0
+        try:
+            self.config["hedge_percentile"] = min(99, max(0, int(self.hedge_var.get())))
+        except ValueError:
+            self.config["hedge_percentile"] = 0
 
         # 保存自定义提示词 (包含对内置提示词的修改)
         custom_prompts = {}
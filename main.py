@@ -32,6 +32,19 @@ DEFAULT_CONFIG = {
     "base_url": "",
     "api_key": "",
     "model": "",
+    "concurrency": 4,
+    "adaptive_concurrency": False,
+    "batch_size": 1,
+    "use_cache": True,
+    "cache_max_entries": 100000,
+    "rpm": 0,
+    "tpm": 0,
+    "hedge_percentile": 0,
+    "hedge_base_url": "",
+    "hedge_api_key": "",
+    "hedge_model": "",
+    # 参与负载均衡的其他服务商，如 [{"name": "通义千问", "api_key": "sk-..."}]
+    "extra_providers": [],
     "custom_prompts": {},
 }
 
@@ -60,11 +73,17 @@ def load_config():
     return config
 
 
-def main():
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
     logger.info(f"程序启动，基础目录: {BASE_DIR}")
 
     config = load_config()
 
+    # 命令行模式：python main.py check FILE ...，不加载界面
+    if argv and argv[0] == "check":
+        from cli import run_cli
+        sys.exit(run_cli(argv[1:], config, BASE_DIR))
+
     from gui.app import MainApp
 
     app = MainApp(config=config, config_path=CONFIG_PATH, base_dir=BASE_DIR)